@@ -0,0 +1,233 @@
+# backend benchmarks: python -m bench (run from the Code folder)
+
+import argparse, fnmatch, json, multiprocessing, os, platform, queue, shutil, subprocess, sys, tempfile, threading, time
+import PyPDF2
+from corpus import CORPUS_PROFILES, corpus_paths
+from editor import PDFEditorBackend
+from events import OperationEvent
+
+# seconds from starting to import the gui until it is imported, until the
+# window is first painted and until the backend is loaded; printed as JSON
+# by a fresh interpreter, so nothing is imported yet. The window needs a display
+STARTUP_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import gui
+import tkinter as tk
+timings = {"import": time.perf_counter() - start}
+try:
+    window = tk.Tk()
+except tk.TclError:
+    window = None
+if window is not None:
+    app = gui.PDFeditor_GUI(window)
+    window.wait_visibility(window)
+    window.update_idletasks()
+    timings["first-paint"] = time.perf_counter() - start
+    while app.pb is None:
+        window.update()
+    timings["ready"] = time.perf_counter() - start
+    app.close()
+print(json.dumps(timings))
+"""
+
+
+# case options passed to the PDFEditorBackend instead of the operation
+BACKEND_OPTIONS = ("use_mmap",)
+
+
+def benchmark_cases(spec):
+    """(case name, backend method, page ranges or None, options) for one corpus entry."""
+    if spec.files > 1:
+        return [
+            ("merge", "merge_pdfs", None, {}),
+            ("merge-streaming", "merge_pdfs", None, {"streaming": True}),
+            ("merge-dedup", "merge_pdfs", None, {"dedup": True}),
+            ("merge-parallel", "merge_pdfs", None, {"workers": 4}),
+        ]
+    step = max(1, spec.pages // 20)
+    cases = []
+    for suffix, options in (("", {"passthrough": False}), ("-passthrough", {"passthrough": True})):
+        cases += [
+            ("extract" + suffix, "extract_pages", ["1-:2"], options),
+            ("delete" + suffix, "delete_pages", ["2-:3"], options),
+            ("split" + suffix, "split_pdfs", [f"1-:{step}"], options),
+        ]
+    # a few pages of a large file, read up front against memory-mapped
+    cases += [
+        ("extract-few", "extract_pages", ["1-10"], {}),
+        ("extract-few-mmap", "extract_pages", ["1-10"], {"use_mmap": True}),
+    ]
+    # recompression on one thread against all cores
+    cases += [
+        ("extract-optimize-1thread", "extract_pages", ["1-"], {"optimize": "balanced", "optimize_threads": 1}),
+        ("extract-optimize", "extract_pages", ["1-"], {"optimize": "balanced"}),
+    ]
+    return cases
+
+
+def _peak_rss():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if platform.system() == "Darwin" else peak * 1024
+
+
+def _measure(connection, method, args, options):
+    # runs in a fresh process so the peak RSS belongs to this operation alone
+    message_queue = queue.Queue()
+    backend_options = {key: options.pop(key) for key in BACKEND_OPTIONS if key in options}
+    backend = PDFEditorBackend(open_folder=False, cache_bytes=0, **backend_options)
+    start = time.perf_counter()
+    getattr(backend, method)(*args, message_queue, threading.Event(), **options)
+    wall_seconds = time.perf_counter() - start
+    errors = []
+    while not message_queue.empty():
+        item = message_queue.get_nowait()
+        if not isinstance(item, OperationEvent) and item[1]:
+            errors.append(item[0])
+    connection.send((wall_seconds, _peak_rss(), errors))
+    connection.close()
+
+
+def run_case(method, inputs, pages, options):
+    output_folder = tempfile.mkdtemp(prefix="mdes-bench-")
+    try:
+        args = (inputs, output_folder) + ((pages,) if pages is not None else ())
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.get_context("spawn").Process(target=_measure, args=(sender, method, args, dict(options)))
+        process.start()
+        sender.close()
+        wall_seconds, peak_rss, errors = receiver.recv()
+        process.join()
+        output_bytes = sum(os.path.getsize(os.path.join(output_folder, name)) for name in os.listdir(output_folder))
+        return wall_seconds, peak_rss, output_bytes, errors
+    finally:
+        shutil.rmtree(output_folder, ignore_errors=True)
+
+
+def run_startup():
+    """Startup timings of the gui in a fresh interpreter: {"import": s, ...}."""
+    completed = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], cwd=os.path.dirname(os.path.abspath(__file__)),
+                               capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+    return json.loads(completed.stdout)
+
+
+def run_benchmarks(profile, corpus_folder, repeat=1, only=None, stream=sys.stdout):
+    results = []
+    if not only or fnmatch.filter(("startup/import", "startup/first-paint", "startup/ready"), only):
+        runs = [run_startup() for _ in range(repeat)]
+        # first paint and ready are missing without a display
+        for stage in runs[0]:
+            name = f"startup/{stage}"
+            if only and not fnmatch.fnmatch(name, only):
+                continue
+            result = {
+                "case": name,
+                "operation": "startup",
+                "options": {},
+                "pages": 0,
+                "files": 0,
+                "input_bytes": 0,
+                "wall_seconds": min(run[stage] for run in runs),
+                "peak_rss_bytes": None,
+                "output_bytes": 0,
+                "errors": [],
+            }
+            results.append(result)
+            print(f"{name:<36} {result['wall_seconds']:9.3f} s", file=stream)
+    for spec in CORPUS_PROFILES[profile]:
+        inputs = corpus_paths(spec, corpus_folder)
+        input_bytes = sum(os.path.getsize(path) for path in inputs)
+        for case_name, method, pages, options in benchmark_cases(spec):
+            name = f"{case_name}/{spec.name}"
+            if only and not fnmatch.fnmatch(name, only):
+                continue
+            runs = [run_case(method, inputs, pages, options) for _ in range(repeat)]
+            errors = [error for run in runs for error in run[3]]
+            rss_values = [run[1] for run in runs if run[1] is not None]
+            result = {
+                "case": name,
+                "operation": method,
+                "options": options,
+                "pages": spec.pages,
+                "files": spec.files,
+                "input_bytes": input_bytes,
+                "wall_seconds": min(run[0] for run in runs),
+                "peak_rss_bytes": max(rss_values) if rss_values else None,
+                "output_bytes": runs[-1][2],
+                "errors": errors,
+            }
+            results.append(result)
+            rss = f"{result['peak_rss_bytes'] / 1e6:9.1f}" if result["peak_rss_bytes"] else "      n/a"
+            print(f"{name:<36} {result['wall_seconds']:9.3f} s {rss} MB {result['output_bytes'] / 1e6:10.2f} MB out"
+                  + ("  ERROR" if errors else ""), file=stream)
+    return {
+        "profile": profile,
+        "environment": {
+            "python": platform.python_version(),
+            "pypdf2": PyPDF2.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, time_tolerance, rss_tolerance, size_tolerance):
+    """Return a list of regression messages of current against baseline."""
+    baseline_results = {result["case"]: result for result in baseline.get("results", [])}
+    regressions = []
+    for result in current["results"]:
+        if result["errors"]:
+            regressions.append(f"{result['case']}: failed with {result['errors'][0]}")
+        reference = baseline_results.get(result["case"])
+        if reference is None:
+            continue
+        checks = (
+            ("wall time", "wall_seconds", time_tolerance),
+            ("peak RSS", "peak_rss_bytes", rss_tolerance),
+            ("output size", "output_bytes", size_tolerance),
+        )
+        for label, key, tolerance in checks:
+            old, new = reference.get(key), result.get(key)
+            if old and new and new > old * (1 + tolerance):
+                regressions.append(f"{result['case']}: {label} {new / old - 1:+.0%} ({old:.4g} -> {new:.4g})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Benchmark the PDFEditorBackend operations on a synthetic corpus.")
+    parser.add_argument("--profile", choices=sorted(CORPUS_PROFILES), default="quick")
+    parser.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "mdes-bench-corpus"),
+                        help="where generated PDFs are kept between runs")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per case; the fastest is reported")
+    parser.add_argument("--only", help="only run cases matching this pattern, e.g. 'split*'")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="results file to compare against; exits 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed wall time increase (0.15 = 15%%)")
+    parser.add_argument("--rss-tolerance", type=float, default=0.15, help="allowed peak RSS increase")
+    parser.add_argument("--size-tolerance", type=float, default=0.01, help="allowed output size increase")
+    args = parser.parse_args(argv)
+
+    current = run_benchmarks(args.profile, args.corpus_dir, args.repeat, args.only)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as results_file:
+            json.dump(current, results_file, indent=2)
+    failed = any(result["errors"] for result in current["results"])
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            regressions = compare(current, json.load(baseline_file), args.tolerance, args.rss_tolerance, args.size_tolerance)
+        for regression in regressions:
+            print("REGRESSION " + regression, file=sys.stderr)
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
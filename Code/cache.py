@@ -0,0 +1,71 @@
+# parsed document cache shared by the backend operations
+
+import os, threading
+from collections import OrderedDict
+from fileio import open_reader
+
+
+class DocumentCache:
+    """LRU cache of parsed PdfReader objects with a byte budget.
+
+    Entries are keyed by the absolute path and validated against the file's
+    mtime, size and inode, so an edited or replaced file is parsed again. The
+    cost of an entry is the file size (PdfReader keeps the whole file in
+    memory, or a map of it with use_mmap); least recently used readers are dropped once the budget is
+    exceeded and files larger than the budget are never cached.
+    """
+
+    def __init__(self, max_bytes=512 * 1024 * 1024, use_mmap=False):
+        self.max_bytes = max_bytes
+        self.use_mmap = use_mmap
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            if entry is not None:
+                self._remove(path)
+        reader = open_reader(path, self.use_mmap)
+        if stat.st_size <= self.max_bytes:
+            with self._lock:
+                if path in self._entries:
+                    self._remove(path)
+                self._entries[path] = (signature, reader, stat.st_size)
+                self.current_bytes += stat.st_size
+                while self.current_bytes > self.max_bytes:
+                    self._remove(next(iter(self._entries)))
+                    self.evictions += 1
+        return reader
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _remove(self, path):
+        _, _, size = self._entries.pop(path)
+        self.current_bytes -= size
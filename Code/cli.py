@@ -0,0 +1,298 @@
+# headless command line entry point: python -m cli (run from the Code folder)
+
+import argparse, json, os, queue, sys, threading, time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from editor import OPERATIONS, PDFEditorBackend
+from events import OperationEvent
+from optimize import OPTIMIZE_LEVELS
+from watch import FolderWatcher, WatchRule
+# extra keyword arguments a manifest job may pass through to the backend
+JOB_OPTIONS = {
+    "merge": ("streaming", "dedup", "workers", "fan_in", "optimize", "optimize_threads"),
+    "delete": ("passthrough", "optimize", "optimize_threads", "incremental", "in_place"),
+    "extract": ("passthrough", "optimize", "optimize_threads"),
+    "split": ("workers", "passthrough", "optimize", "optimize_threads"),
+}
+
+
+def load_manifest(path):
+    """Read a JSON or YAML manifest: a list of jobs or {"concurrency": n, "jobs": [...]}.
+
+    A job is {"operation": "merge|delete|extract|split", "inputs": [...],
+    "output": folder, "pages": "1, 3-5"} plus the optional "streaming", "dedup" and
+    "fan_in" (merge), "workers" (merge/split), "incremental" and "in_place" (delete), "passthrough"
+    (delete/extract/split; on by default for split), "optimize" (fast|balanced|smallest) and
+    "optimize_threads", "mmap" (memory-mapped inputs) and "events" (JSON
+    lines progress log) settings.
+    """
+    manifest = _read_json_or_yaml(path)
+    if isinstance(manifest, list):
+        manifest = {"jobs": manifest}
+    # relative paths in a manifest are relative to the manifest itself
+    base_folder = os.path.dirname(os.path.abspath(path))
+    for job in manifest.get("jobs", []):
+        if not isinstance(job, dict):
+            raise SystemExit(f"Every job of the manifest must be an object, not {job!r}.")
+        if isinstance(job.get("inputs", []), list):
+            job["inputs"] = [os.path.join(base_folder, p) for p in job.get("inputs", [])]
+        if job.get("output"):
+            job["output"] = os.path.join(base_folder, job["output"])
+    return manifest
+
+
+def load_watch_rules(path):
+    """Read JSON or YAML hot folder rules: a list of rules or {"workers": n, "polling": bool, "rules": [...]}.
+
+    A rule is {"folder": watched folder, "operation": "merge|delete|extract|split",
+    "output": folder, "pages": "1, 3-5"} plus the optional "batch_size",
+    "batch_seconds", "settle_seconds" and "pattern" (see watch.WatchRule)
+    and the options a manifest job of the operation takes. Returns (rules,
+    settings).
+    """
+    settings = _read_json_or_yaml(path)
+    if isinstance(settings, list):
+        settings = {"rules": settings}
+    base_folder = os.path.dirname(os.path.abspath(path))
+    rules = []
+    for rule in settings.get("rules", []):
+        operation = rule.get("operation", "").lower()
+        if not rule.get("folder") or not rule.get("output"):
+            raise SystemExit("Every rule needs a folder and an output folder.")
+        fields = {key: rule[key] for key in ("batch_size", "batch_seconds", "settle_seconds", "pattern") if key in rule}
+        rules.append(WatchRule(os.path.join(base_folder, rule["folder"]), operation, os.path.join(base_folder, rule["output"]),
+                               _page_ranges(rule.get("pages")), options={key: rule[key] for key in JOB_OPTIONS.get(operation, ()) if key in rule},
+                               **fields))
+    return rules, settings
+
+
+def _read_json_or_yaml(path):
+    with open(path, encoding="utf-8") as config_file:
+        if os.path.splitext(path)[1].lower() in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError:
+                raise SystemExit("YAML files need PyYAML (pip install pyyaml).")
+            return yaml.safe_load(config_file)
+        return json.load(config_file)
+
+
+def _page_ranges(pages):
+    if pages is None:
+        return None
+    if isinstance(pages, str):
+        pages = pages.split(',')
+    return [str(p).strip() for p in pages if str(p).strip()]
+
+
+def run_job(job):
+    """Run one job in this process and return its result record.
+
+    Errors outside the backend (an output folder that cannot be created,
+    an input removed meanwhile) fail the job rather than the whole run.
+    """
+    operation = str(job.get("operation", "")).lower()
+    inputs = job.get("inputs", [])
+    result = _result(job, operation, inputs)
+    try:
+        _run_job(job, operation, inputs, result)
+    except Exception as e:
+        result["ok"] = False
+        result["messages"].append(f"An error occurred: {str(e)}")
+    return result
+
+
+def _result(job, operation, inputs):
+    names = ", ".join(os.path.basename(str(p)) for p in inputs[:2]) if isinstance(inputs, list) else str(inputs)
+    return {
+        "name": str(job.get("name", f"{operation} {names}")),
+        "operation": operation,
+        "ok": False,
+        "seconds": 0.0,
+        "input_bytes": 0,
+        "output_bytes": 0,
+        "pages": 0,
+        "messages": [],
+    }
+
+
+def _run_job(job, operation, inputs, result):
+    if not isinstance(inputs, list):
+        result["messages"].append("The inputs must be a list of PDF files.")
+        return
+    result["input_bytes"] = sum(os.path.getsize(p) for p in inputs if os.path.isfile(p))
+    if operation not in OPERATIONS:
+        result["messages"].append(f"Unknown operation: '{operation}'.")
+        return
+    output_folder = job.get("output")
+    if not output_folder:
+        result["messages"].append("Missing output folder.")
+        return
+    os.makedirs(output_folder, exist_ok=True)
+
+    args = [inputs, output_folder]
+    if operation != "merge":
+        pages = _page_ranges(job.get("pages"))
+        if not pages:
+            result["messages"].append("Missing page ranges.")
+            return
+        args.append(pages)
+    options = {key: job[key] for key in JOB_OPTIONS.get(operation, ()) if key in job}
+
+    message_queue = queue.Queue()
+    backend = PDFEditorBackend(open_folder=False, use_mmap=bool(job.get("mmap")), event_log_path=job.get("events"))
+    start = time.perf_counter()
+    getattr(backend, OPERATIONS[operation])(*args, message_queue, threading.Event(), output_tag=job.get("output_tag"), **options)
+    result["seconds"] = time.perf_counter() - start
+
+    errors = False
+    while not message_queue.empty():
+        item = message_queue.get_nowait()
+        if isinstance(item, OperationEvent):
+            if item.kind == "end":
+                result["pages"] = item.data["pages"]
+                result["output_bytes"] = item.data["bytes_written"]
+                result["phases"] = item.data["phases"]
+            continue
+        message, is_error = item
+        errors = errors or is_error
+        result["messages"].append(message)
+    result["ok"] = not errors and "Operation finished!" in result["messages"]
+
+
+def run_jobs(jobs, concurrency):
+    """Run jobs on a process pool, yielding result records as they finish."""
+    if concurrency <= 1:
+        for job in jobs:
+            yield run_job(job)
+        return
+    with ProcessPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(run_job, job): job for job in jobs}
+        try:
+            for future in as_completed(futures):
+                try:
+                    yield future.result()
+                except Exception as e:
+                    # the worker process died or the job could not be sent to it
+                    job = futures[future]
+                    result = _result(job, str(job.get("operation", "")).lower(), job.get("inputs", []))
+                    result["messages"].append(f"An error occurred: {str(e)}")
+                    yield result
+        except KeyboardInterrupt:
+            pool.shutdown(cancel_futures=True)
+            raise
+
+
+def print_summary(results, wall_seconds, stream=sys.stdout):
+    print(f"{'job':<40} {'op':<8} {'status':<7} {'seconds':>9} {'MB in':>9} {'MB/s':>9} {'pages/s':>9} {'MB out':>9}", file=stream)
+    for result in results:
+        megabytes = result["input_bytes"] / 1e6
+        rate = megabytes / result["seconds"] if result["seconds"] else 0.0
+        page_rate = result["pages"] / result["seconds"] if result["seconds"] else 0.0
+        status = "ok" if result["ok"] else "FAILED"
+        print(f"{result['name'][:40]:<40} {result['operation']:<8} {status:<7} "
+              f"{result['seconds']:>9.2f} {megabytes:>9.2f} {rate:>9.2f} {page_rate:>9.1f} {result['output_bytes'] / 1e6:>9.2f}", file=stream)
+    failed = sum(not result["ok"] for result in results)
+    total_megabytes = sum(result["input_bytes"] for result in results) / 1e6
+    print(f"{len(results)} jobs, {failed} failed, {wall_seconds:.2f} s wall, "
+          f"{len(results) / wall_seconds if wall_seconds else 0.0:.2f} jobs/s, "
+          f"{total_megabytes / wall_seconds if wall_seconds else 0.0:.2f} MB/s", file=stream)
+
+
+def watch(rules_path, polling=False, workers=None, stream=sys.stderr):
+    """Run the hot folder rules of rules_path until interrupted."""
+    rules, settings = load_watch_rules(rules_path)
+    message_queue = queue.Queue()
+    try:
+        watcher = FolderWatcher(rules, message_queue, workers=workers or settings.get("workers"),
+                                polling=polling or bool(settings.get("polling")))
+    except ValueError as e:
+        raise SystemExit(str(e))
+    watcher.start()
+    print(f"Watching {', '.join(rule.folder for rule in watcher.rules)} "
+          f"({'polling' if watcher.polling else 'inotify'}); press Ctrl+C to stop.", file=stream)
+    try:
+        while True:
+            watcher.step()
+            while not message_queue.empty():
+                message, is_error = message_queue.get_nowait()
+                print(("ERROR " if is_error else "") + message, file=stream)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m cli", description="Merge, delete, extract and split PDFs without the GUI.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="run every job of a JSON/YAML manifest")
+    run_parser.add_argument("manifest")
+    run_parser.add_argument("-j", "--concurrency", type=int, help="number of jobs to run at once (default: manifest value or CPU count)")
+    run_parser.add_argument("--mmap", action="store_true", help="memory-map the inputs of every job")
+    run_parser.add_argument("--events", help="append progress events of every job to this JSON lines file")
+
+    watch_parser = subparsers.add_parser("watch", help="turn PDFs dropped into folders into jobs, following JSON/YAML rules")
+    watch_parser.add_argument("rules")
+    watch_parser.add_argument("-j", "--workers", type=int, help="number of jobs to run at once (default: up to 4)")
+    watch_parser.add_argument("--polling", action="store_true", help="list the folders instead of using inotify (network shares)")
+
+    for operation in OPERATIONS:
+        op_parser = subparsers.add_parser(operation, help=f"{operation} a single job")
+        op_parser.add_argument("inputs", nargs="+")
+        op_parser.add_argument("-o", "--output", required=True, help="output folder")
+        op_parser.add_argument("--mmap", action="store_true", help="memory-map the inputs")
+        op_parser.add_argument("--events", help="append progress events to this JSON lines file")
+        op_parser.add_argument("--optimize", choices=list(OPTIMIZE_LEVELS),
+                               help="recompress streams and write object and xref streams (fast is quickest, smallest the smallest)")
+        op_parser.add_argument("--optimize-threads", type=int, help="threads used to recompress (default: CPU count)")
+        if operation != "merge":
+            op_parser.add_argument("-p", "--pages", required=True, help='page ranges, e.g. "1, 3-5, 10-"')
+            op_parser.add_argument("--passthrough", action=argparse.BooleanOptionalAction,
+                                   help="copy unchanged objects byte for byte (default: on for split, off otherwise)")
+        if operation == "merge":
+            op_parser.add_argument("--streaming", action="store_true", help="constant-memory merge")
+            op_parser.add_argument("--dedup", action="store_true", help="write identical fonts, images and profiles once (implies --streaming)")
+            op_parser.add_argument("--workers", type=int, default=1, help="processes merging chunks of the inputs in parallel (implies --streaming)")
+            op_parser.add_argument("--fan-in", type=int, help="inputs merged into one intermediate file (default: 32)")
+        if operation == "delete":
+            op_parser.add_argument("--incremental", action="store_true", help="append the change to a copy of the input instead of rewriting it")
+            op_parser.add_argument("--in-place", action="store_true", help="append the change to the input itself (implies --incremental)")
+        if operation == "split":
+            op_parser.add_argument("--workers", type=int, default=1, help="processes used to write parts")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "watch":
+        return watch(args.rules, args.polling, args.workers)
+    if args.command == "run":
+        manifest = load_manifest(args.manifest)
+        jobs = manifest.get("jobs", [])
+        concurrency = args.concurrency or manifest.get("concurrency") or os.cpu_count() or 1
+        for number, job in enumerate(jobs, start=1):
+            # jobs running at once may share inputs and an output folder
+            job.setdefault("output_tag", f"job{number}")
+            if args.mmap:
+                job.setdefault("mmap", True)
+            if args.events:
+                job.setdefault("events", os.path.abspath(args.events))
+    else:
+        jobs = [{key: value for key, value in vars(args).items() if key != "command" and value is not None}]
+        jobs[0]["operation"] = args.command
+        concurrency = 1
+
+    start = time.perf_counter()
+    results = []
+    for result in run_jobs(jobs, min(concurrency, max(len(jobs), 1))):
+        results.append(result)
+        for message in result["messages"]:
+            print(f"[{result['name']}] {message}", file=sys.stderr)
+    print_summary(results, time.perf_counter() - start)
+    return 0 if all(result["ok"] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
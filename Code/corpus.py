@@ -0,0 +1,123 @@
+# deterministic synthetic pdf corpus used by the benchmarks
+
+import os, random
+from collections import namedtuple
+
+# pages: pages per file; image_bytes: raw image payload per page (0 for text
+# only); shared_density: share of pages drawing the document-wide logo and
+# colour profile instead of their own image; files: number of files;
+# common_logo: every file embeds the same logo and profile, like statements
+# from one sender; scans: images are uncompressed few-tone scans instead of
+# incompressible noise
+CorpusSpec = namedtuple("CorpusSpec", "name pages image_bytes shared_density files seed common_logo scans",
+                        defaults=(0, 0.0, 1, 0, False, False))
+# grey levels of scanned images
+SCAN_TONES = bytes([0x00, 0x55, 0xaa, 0xff] * 64)
+
+CORPUS_PROFILES = {
+    "quick": [
+        CorpusSpec("text100", 100),
+        CorpusSpec("text2k", 2000),
+        CorpusSpec("images40", 40, image_bytes=256 * 1024),
+        CorpusSpec("shared400", 400, image_bytes=32 * 1024, shared_density=0.9),
+        CorpusSpec("files60", 3, files=60),
+        CorpusSpec("statements200", 2, image_bytes=32 * 1024, shared_density=1.0, files=200, common_logo=True),
+        CorpusSpec("scans40", 40, image_bytes=1024 * 1024, scans=True),
+    ],
+    "full": [
+        CorpusSpec("text10", 10),
+        CorpusSpec("text1k", 1000),
+        CorpusSpec("text50k", 50000),
+        CorpusSpec("images300", 300, image_bytes=1024 * 1024),
+        CorpusSpec("shared5k", 5000, image_bytes=64 * 1024, shared_density=0.95),
+        CorpusSpec("files1000", 2, image_bytes=16 * 1024, files=1000),
+        CorpusSpec("statements1000", 3, image_bytes=64 * 1024, shared_density=1.0, files=1000, common_logo=True),
+        CorpusSpec("scans400", 400, image_bytes=1024 * 1024, scans=True),
+        CorpusSpec("images2g", 2000, image_bytes=1024 * 1024),
+    ],
+}
+
+
+def corpus_paths(spec, folder):
+    """Generate the files of spec in folder (once) and return their paths."""
+    # the spec is part of the file name, so a changed spec never reuses stale files
+    tag = f"{spec.name}-p{spec.pages}-i{spec.image_bytes}-s{spec.shared_density}-r{spec.seed}" + ("-c" if spec.common_logo else "") + ("-scan" if spec.scans else "")
+    paths = [os.path.join(folder, f"{tag}-{index:04d}.pdf") for index in range(spec.files)]
+    os.makedirs(folder, exist_ok=True)
+    for index, path in enumerate(paths):
+        if not os.path.exists(path):
+            temporary_path = path + ".tmp"
+            with open(temporary_path, "wb") as output:
+                write_synthetic_pdf(output, spec.pages, spec.image_bytes, spec.shared_density,
+                                    seed=spec.seed * 100003 + index,
+                                    logo_seed=spec.seed if spec.common_logo else None, scans=spec.scans)
+            os.replace(temporary_path, path)
+    return paths
+
+
+def write_synthetic_pdf(output, pages, image_bytes=0, shared_density=0.0, seed=0, logo_seed=None, scans=False):
+    """Write a PDF byte for byte determined by the arguments.
+
+    The file is written directly rather than through PyPDF2, so upgrading the
+    library never changes the corpus it is measured on. With logo_seed the
+    logo and colour profile depend only on it, so files can share them.
+    """
+    rng = random.Random(seed)
+    logo_rng = rng if logo_seed is None else random.Random(logo_seed)
+    offsets = {}
+
+    def write_object(object_id, body, stream=None):
+        offsets[object_id] = output.tell()
+        output.write(f"{object_id} 0 obj\n".encode())
+        if stream is None:
+            output.write(body + b"\nendobj\n")
+        else:
+            output.write(body[:-2] + f"/Length {len(stream)} >>\nstream\n".encode())
+            output.write(stream + b"\nendstream\nendobj\n")
+
+    def image_object(object_id, size, source=rng):
+        width = 256
+        height = max(1, size // width)
+        body = f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} /ColorSpace /DeviceGray /BitsPerComponent 8 >>"
+        pixels = source.randbytes(width * height)
+        write_object(object_id, body.encode(), pixels.translate(SCAN_TONES) if scans else pixels)
+
+    output.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+    # 1 catalog, 2 page tree, 3 font, 4 shared logo, 5 shared colour profile
+    write_object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    if image_bytes:
+        image_object(4, image_bytes, logo_rng)
+        write_object(5, b"<< /N 1 >>", logo_rng.randbytes(8 * 1024))
+    next_id = 6
+    page_ids = []
+    for page in range(pages):
+        page_id, content_id = next_id, next_id + 1
+        next_id += 2
+        xobject = ""
+        if image_bytes:
+            if rng.random() < shared_density:
+                image_ref = "4 0 R"
+            else:
+                image_object(next_id, image_bytes)
+                image_ref = f"{next_id} 0 R"
+                next_id += 1
+            xobject = f" /XObject << /Im0 {image_ref} >> /ColorSpace << /CS0 [/ICCBased 5 0 R] >>"
+        text = f"BT /F1 24 Tf 72 720 Td (Synthetic page {page + 1}) Tj ET"
+        if image_bytes:
+            text += " q 400 0 0 300 72 300 cm /Im0 Do Q"
+        write_object(content_id, b"<< >>", text.encode())
+        write_object(page_id, (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                               f"/Resources << /Font << /F1 3 0 R >>{xobject} >> /Contents {content_id} 0 R >>").encode())
+        page_ids.append(page_id)
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    write_object(2, f"<< /Type /Pages /Count {pages} /Kids [{kids}] >>".encode())
+    write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+    xref_offset = output.tell()
+    output.write(f"xref\n0 {next_id}\n0000000000 65535 f \n".encode())
+    for object_id in range(1, next_id):
+        if object_id in offsets:
+            output.write(f"{offsets[object_id]:010d} 00000 n \n".encode())
+        else:
+            output.write(b"0000000000 00000 f \n")
+    output.write(f"trailer\n<< /Size {next_id} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
@@ -0,0 +1,159 @@
+# persistent page count index of input pdfs
+
+import hashlib, json, os, threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from fileio import AtomicOutput, open_reader
+
+# bumped whenever the entry layout changes; older entries are rebuilt
+INDEX_VERSION = 2
+# index files kept on disk; the least recently written are removed
+MAX_INDEX_FILES = 2000
+# entries kept in memory
+MEMORY_ENTRIES = 64
+
+
+def default_index_folder():
+    base = os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "mdes-pdf-editor", "index")
+
+
+def file_signature(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size, stat.st_ino]
+
+
+def build_entry(path):
+    """Page count of a PDF, as the backend will see it.
+
+    Only what the GUI reads is stored. Object offsets and the xref location
+    would not spare the backend any work: PyPDF2 parses the xref and page
+    tree itself whenever it opens a file.
+    """
+    signature = file_signature(path)
+    reader = open_reader(path, use_mmap=True)
+    return {
+        "version": INDEX_VERSION,
+        "path": os.path.abspath(path),
+        "signature": signature,
+        "page_count": len(reader.pages),
+    }
+
+
+class DocumentIndex:
+    """On-disk index of page counts, built in the background.
+
+    One JSON file per document, named after a hash of its absolute path and
+    valid while the file's mtime, size and inode are unchanged (the same
+    signature the document cache uses). lookup() never parses: it answers
+    from memory or disk, or returns None until prefetch() has indexed the
+    file, so the GUI can validate page ranges without waiting on a worker.
+    """
+
+    def __init__(self, folder=None):
+        self.folder = folder or default_index_folder()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-index")
+
+    def lookup(self, path):
+        """The current entry of path, or None if it is not indexed (yet)."""
+        path = os.path.abspath(path)
+        try:
+            signature = file_signature(path)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry["signature"] == signature:
+                self._entries.move_to_end(path)
+                return entry
+        entry = self._load(path)
+        if entry is None or entry["signature"] != signature or entry.get("version") != INDEX_VERSION:
+            return None
+        self._remember(path, entry)
+        return entry
+
+    def get(self, path):
+        """The entry of path, indexing it now if needed."""
+        entry = self.lookup(path)
+        if entry is None:
+            entry = self._build(os.path.abspath(path))
+        return entry
+
+    def prefetch(self, paths, on_ready=None):
+        """Index paths in the background; on_ready(path, entry) runs on the index thread."""
+        for path in paths:
+            path = os.path.abspath(path)
+            with self._lock:
+                if path in self._pending:
+                    continue
+            entry = self.lookup(path)
+            if entry is not None:
+                if on_ready is not None:
+                    on_ready(path, entry)
+                continue
+            with self._lock:
+                self._pending[path] = self._executor.submit(self._prefetch_one, path, on_ready)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _prefetch_one(self, path, on_ready):
+        try:
+            entry = self._build(path)
+        except Exception:
+            # unreadable files are reported by the operation that uses them
+            entry = None
+        finally:
+            with self._lock:
+                self._pending.pop(path, None)
+        if on_ready is not None and entry is not None:
+            on_ready(path, entry)
+
+    def _build(self, path):
+        entry = build_entry(path)
+        self._remember(path, entry)
+        self._store(path, entry)
+        return entry
+
+    def _remember(self, path, entry):
+        with self._lock:
+            self._entries[path] = entry
+            self._entries.move_to_end(path)
+            while len(self._entries) > MEMORY_ENTRIES:
+                self._entries.popitem(last=False)
+
+    def _file_name(self, path):
+        return os.path.join(self.folder, hashlib.sha1(path.encode("utf-8")).hexdigest() + ".json")
+
+    def _load(self, path):
+        try:
+            with open(self._file_name(path), encoding="utf-8") as index_file:
+                entry = json.load(index_file)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get("path") == path else None
+
+    def _store(self, path, entry):
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            with AtomicOutput(self._file_name(path), replace=True) as index_file:
+                index_file.write(json.dumps(entry, separators=(",", ":")).encode("utf-8"))
+                index_file.commit()
+            self._prune()
+        except OSError:
+            # the index is only an accelerator; a read-only home folder is fine
+            pass
+
+    def _prune(self):
+        names = [name for name in os.listdir(self.folder) if name.endswith(".json")]
+        if len(names) <= MAX_INDEX_FILES:
+            return
+        paths = sorted((os.path.join(self.folder, name) for name in names), key=os.path.getmtime)
+        for stale in paths[:len(paths) - MAX_INDEX_FILES]:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
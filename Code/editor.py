@@ -1,145 +1,559 @@
 # merge, delete, extract, and split functions 
 
-import os, platform, subprocess
+import contextlib, gc, math, multiprocessing, os, platform, shutil, subprocess, tempfile, threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 import PyPDF2
+from cache import DocumentCache
+from events import EventLog, OperationTracker
+from fileio import AtomicOutput, OperationCancelled, open_reader
+from incremental import IncrementalDeletion
+from optimize import StreamCompressor
+from passthrough import PageSubsetWriter
+from selection import PageSelection, parse_page_ranges
+from streaming import StreamingPdfWriter
 
+# operation name: PDFEditorBackend method, as used by the cli and the watcher
+OPERATIONS = {
+    "merge": "merge_pdfs",
+    "delete": "delete_pages",
+    "extract": "extract_pages",
+    "split": "split_pdfs",
+}
+# inputs merged into one intermediate file by the parallel merge
+MERGE_FAN_IN = 32
+# inputs of a streaming merge between two collections of their released objects
+STREAMING_COLLECT_INTERVAL = 25
 
-class PDFEditorBackend:
-    def __init__(self):
-        pass
-
-    def _create_outputfile_name(self, input_paths, output_folder_path, function_name, message_queue):
-        base_names = [] 
-        if len(input_paths) == 1:
-            base_name = os.path.splitext(os.path.basename(input_paths[0]))[0]
-            truncated_name = base_name[:5]
-            base_names.append(truncated_name)
-        elif len(input_paths) > 1:
+_split_reader = None
+_split_subset_writer = None
+_split_stop_event = None
+_split_compressor = None
+_merge_use_mmap = False
+_merge_stop_event = None
+
+
+def _init_merge_worker(use_mmap, stop_event):
+    global _merge_use_mmap, _merge_stop_event
+    _merge_use_mmap = use_mmap
+    _merge_stop_event = stop_event
+
+
+def _merge_chunk(input_paths, output_path, dedup=False, optimize=None, optimize_threads=None):
+    # one node of the merge tree: inputs (or intermediates) in order into
+    # output_path; returns (pages, duplicates, bytes saved, hash seconds) and
+    # raises OperationCancelled once the stop event is set
+    compressor = StreamCompressor(optimize, optimize_threads) if optimize else None
+    try:
+        with AtomicOutput(output_path, _merge_stop_event) as output_pdf:
+            pdf_writer = StreamingPdfWriter(output_pdf, dedup, compressor)
+            pages = 0
             for path in input_paths:
-                base_name = os.path.splitext(os.path.basename(path))[0]
-                truncated_name = base_name[:5]
-                base_names.append(truncated_name)
-        outputfile_name = '-'.join(base_names) + function_name
-        outputfile_path = os.path.join(output_folder_path, outputfile_name)
-        if len(outputfile_path) > 255:
-            message_queue.put((f"The generated output path is too long: {len(outputfile_path)} characters."
+                pdf_reader = open_reader(path, _merge_use_mmap)
+                if not pdf_writer.add_reader(pdf_reader, stop_event=_merge_stop_event):
+                    raise OperationCancelled()
+                pages += len(pdf_reader.pages)
+            pdf_writer.close()
+            output_pdf.commit()
+    finally:
+        if compressor is not None:
+            compressor.close()
+    return pages, pdf_writer.duplicates, pdf_writer.bytes_saved, pdf_writer.hash_seconds
+
+
+def _init_split_worker(input_path, use_mmap, passthrough, stop_event, optimize=None, optimize_threads=None):
+    global _split_reader, _split_subset_writer, _split_stop_event, _split_compressor
+    _split_reader = open_reader(input_path, use_mmap)
+    _split_stop_event = stop_event
+    if optimize:
+        _split_compressor = StreamCompressor(optimize, optimize_threads)
+    elif passthrough:
+        _split_subset_writer = PageSubsetWriter(_split_reader, input_path)
+
+
+def _write_split_part(start, stop, output_path):
+    _write_pages(_split_reader, start, stop, output_path, _split_stop_event, _split_subset_writer, _split_compressor)
+    return output_path
+
+
+def _write_pages(pdf_reader, start, stop, output_path, stop_event, subset_writer=None, compressor=None):
+    # subset_writer: copy raw object bytes from the source, shared by all parts;
+    # compressor: recompress through the streaming writer instead;
+    # raises OperationCancelled once stop_event is set
+    if compressor is not None:
+        with AtomicOutput(output_path, stop_event) as output_pdf:
+            pdf_writer = StreamingPdfWriter(output_pdf, compressor=compressor)
+            if not pdf_writer.add_reader(pdf_reader, range(start, stop), stop_event):
+                raise OperationCancelled()
+            pdf_writer.close()
+            output_pdf.commit()
+        return
+    if subset_writer is not None:
+        with AtomicOutput(output_path, stop_event) as output_pdf:
+            if subset_writer.write(range(start, stop), output_pdf):
+                output_pdf.commit()
+                return
+    pdf_writer = PyPDF2.PdfWriter()
+    for page in range(start, stop):
+        if stop_event.is_set():
+            raise OperationCancelled()
+        pdf_writer.add_page(pdf_reader.pages[page])
+    with AtomicOutput(output_path, stop_event) as output_pdf:
+        pdf_writer.write(output_pdf)
+        output_pdf.commit()
+
+
+def _close_merge_pool(pool, folder):
+    pool.shutdown(cancel_futures=True)
+    shutil.rmtree(folder, ignore_errors=True)
+
+
+class PDFEditorBackend:
+    def __init__(self, open_folder=True, cache_bytes=512 * 1024 * 1024, use_mmap=False, event_log_path=None):
+        # headless callers (cli, batch runs) turn off the file browser popup
+        self.open_folder = open_folder
+        # memory-map inputs instead of reading them into memory up front
+        self.use_mmap = use_mmap
+        # parsed inputs are kept so repeated operations on a file skip parsing
+        self.document_cache = DocumentCache(cache_bytes, use_mmap)
+        # progress events are also appended to this file as JSON lines
+        self.event_log = EventLog(event_log_path) if event_log_path else None
+
+    def _create_outputfile_name(self, input_paths, output_folder_path, function_name, message_queue, output_tag=None):
+        output_paths = self._create_outputfile_names(input_paths, output_folder_path, [function_name], message_queue, output_tag)
+        return output_paths and output_paths[0]
+
+    def _create_outputfile_names(self, input_paths, output_folder_path, function_names, message_queue, output_tag=None):
+        # one output path per function name (the suffixes of the parts of a
+        # split); output_tag (a job or batch id) keeps jobs with the same
+        # inputs apart. Outputs are never replaced, so if any of the names is
+        # taken they all get the first number that frees every one of them
+        base_names = [os.path.splitext(os.path.basename(path))[0] for path in input_paths]
+        tag = f"-{output_tag}" if output_tag else ""
+        stem = '-'.join(base_names) + tag
+        if len(os.path.join(output_folder_path, stem + max(function_names, key=len))) > 255 and len(base_names) > 2:
+            # merges of many files are named after the first and last input
+            stem = f"{base_names[0]}-{len(base_names) - 2}more-{base_names[-1]}{tag}"
+        output_paths = [os.path.join(output_folder_path, stem + function_name) for function_name in function_names]
+        longest = max(len(path) for path in output_paths)
+        if longest > 255:
+            message_queue.put((f"The generated output path is too long: {longest} characters."
                              "Please use shorter input filenames.", True))
             return
-        return outputfile_path
-
-    def _parse_page_ranges(self, pages_list, message_queue):
-        if not pages_list:
-            message_queue.put(("pages_list must be a non-empty list of page numbers or ranges.", True))
-            return []
-        parsed_pages_list = []
-        for item in pages_list:
-            if '-' in item:
-                try: 
-                    start, end = map(int, item.split('-'))
-                    if start > end:
-                        message_queue.put((f"Invalid page range: {item}. Start page must not be greater than end page.", True))
-                    else: 
-                        parsed_pages_list.extend(range(start, end+1))
-                except ValueError:
-                    message_queue.put((f"Invalid page range format: '{item}'. Please use numbers separated by a hyphen(-).", True))
-            else:
-                try:
-                    parsed_pages_list.append(int(item))
-                except ValueError:
-                    message_queue.put((f"Invalid page number: '{item}'. Please use integers only.", True))
-        return parsed_pages_list
+        candidates, number = output_paths, 1
+        while any(os.path.exists(path) for path in candidates):
+            candidates = [f"{base}-{number}{extension}" for base, extension in map(os.path.splitext, output_paths)]
+            number += 1
+        return candidates
+
+    def _parse_page_ranges(self, pages_list, page_count, message_queue):
+        return PageSelection(parse_page_ranges(pages_list, message_queue), page_count)
 
-    def merge_pdfs(self, input_paths, output_folder_path, message_queue, stop_event):
+    def _compressor(self, optimize, threads):
+        # the optimize stage: None, or a level of optimize.OPTIMIZE_LEVELS
+        return StreamCompressor(optimize, threads) if optimize else contextlib.nullcontext()
+
+    def merge_pdfs(self, input_paths, output_folder_path, message_queue, stop_event, streaming=False, dedup=False,
+                   optimize=None, optimize_threads=None, workers=1, fan_in=MERGE_FAN_IN, output_tag=None):
+        tracker = self._tracker("merge", message_queue)
         try:
             if len(input_paths) < 2:
                 message_queue.put(("merge_pdfs() requires at least two input PDF files.", True))
                 return
-            output_path = self._create_outputfile_name(input_paths, output_folder_path, "_merged.pdf", message_queue)
+            output_path = self._create_outputfile_name(input_paths, output_folder_path, "_merged.pdf", message_queue, output_tag)
+            if output_path is None:
+                return
+            tracker.total_files = len(input_paths)
+            tracker.start(inputs=input_paths, output_folder=output_folder_path, streaming=streaming, dedup=dedup, optimize=optimize,
+                          workers=workers)
+            if streaming or dedup or optimize or workers > 1:
+                # identical objects are found, and streams recompressed, while
+                # the streaming writer copies pages
+                if workers > 1:
+                    counters = self._merge_tree(input_paths, output_path, message_queue, stop_event, tracker, workers, fan_in,
+                                                dedup, optimize, optimize_threads)
+                else:
+                    with self._compressor(optimize, optimize_threads) as compressor:
+                        pdf_writer = self._merge_streaming(input_paths, output_path, message_queue, stop_event, tracker, dedup, compressor)
+                    counters = None if pdf_writer is None else (pdf_writer.duplicates, pdf_writer.bytes_saved, pdf_writer.hash_seconds)
+                if counters is None:
+                    tracker.end("cancelled")
+                    return
+                stats = {}
+                if dedup:
+                    duplicates, bytes_saved, hash_seconds = counters
+                    stats = {"duplicates": duplicates, "bytes_saved": bytes_saved, "hash_seconds": hash_seconds}
+                    message_queue.put((f"Deduplicated {duplicates} objects: {bytes_saved / 1e6:.2f} MB saved, "
+                                       f"{hash_seconds:.2f} s spent hashing.", False))
+                tracker.end("ok", **stats)
+                self._open_folder(output_folder_path, message_queue)
+                return
             pdf_writer = PyPDF2.PdfWriter()
             for pdf in input_paths:
                 if stop_event.is_set():
                     message_queue.put(("Merging operation was cancelled by the user.", True))
+                    tracker.end("cancelled")
                     return
-                pdf_reader = PyPDF2.PdfReader(pdf)
-                pdf_writer.append(pdf_reader)
-            with open(output_path, "wb") as output_pdf:
-                pdf_writer.write(output_pdf)
+                with tracker.phase("parse"):
+                    pdf_reader = self.document_cache.get(pdf)
+                with tracker.phase("assemble"):
+                    pdf_writer.append(pdf_reader)
+                tracker.advance(pages=len(pdf_reader.pages), files=1)
+            try:
+                self._write_output(pdf_writer.write, output_path, tracker, stop_event)
+            except OperationCancelled:
+                message_queue.put(("Merging operation was cancelled by the user.", True))
+                tracker.end("cancelled")
+                return
+            tracker.end("ok")
             self._open_folder(output_folder_path, message_queue)
         except Exception as e:
             error_message = f"An error occurred: {str(e)}"
+            tracker.end("error", error=str(e))
             message_queue.put((error_message, True))
 
+    def _merge_streaming(self, input_paths, output_path, message_queue, stop_event, tracker, dedup=False, compressor=None):
+        # constant-memory merge: every input is flushed to disk and released
+        # before the next one is parsed; returns the writer, or None if cancelled
+        with AtomicOutput(output_path, stop_event, tracker=tracker) as output_pdf:
+            pdf_writer = StreamingPdfWriter(output_pdf, dedup, compressor)
+            try:
+                for index, pdf in enumerate(input_paths, start=1):
+                    if stop_event.is_set():
+                        break
+                    with tracker.phase("parse"):
+                        pdf_reader = open_reader(pdf, self.use_mmap)
+                    with tracker.phase("serialize"):
+                        if not pdf_writer.add_reader(pdf_reader, stop_event=stop_event):
+                            break
+                    tracker.advance(pages=len(pdf_reader.pages), files=1)
+                    # the parsed objects form reference cycles that would live
+                    # until the next full collection, which comes later the
+                    # more inputs were merged; closing the stream frees the
+                    # file's bytes now, the objects go every few inputs
+                    pdf_reader.stream.close()
+                    if index % STREAMING_COLLECT_INTERVAL == 0:
+                        gc.collect()
+                else:
+                    with tracker.phase("serialize"):
+                        pdf_writer.close()
+                    with tracker.phase("flush"):
+                        output_pdf.commit()
+                    tracker.wrote(os.path.getsize(output_path))
+                    return pdf_writer
+            except OperationCancelled:
+                pass
+        message_queue.put(("Merging operation was cancelled by the user.", True))
+        return None
 
-    def delete_pages(self, input_paths, output_folder_path, pages_list, message_queue, stop_event):
+    def _merge_tree(self, input_paths, output_path, message_queue, stop_event, tracker, workers, fan_in, dedup, optimize, optimize_threads):
+        # worker processes merge chunks of the inputs into intermediate files,
+        # then chunks of those, until one chunk is merged into output_path;
+        # chunks keep the input order, so the pages do too. Returns the summed
+        # dedup counters, or None if cancelled. Like _split_parallel, the
+        # stop event is mirrored to one the workers check while writing
+        fan_in = max(2, fan_in)
+        worker_stop_event = multiprocessing.Event()
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_merge_worker, initargs=(self.use_mmap, worker_stop_event))
+        folder = tempfile.mkdtemp(prefix=".merge-", dir=os.path.dirname(os.path.abspath(output_path)))
+        counters = (0, 0, 0.0)
+        # the first level is spread over all workers even for few inputs
+        chunk_size = min(fan_in, max(2, math.ceil(len(input_paths) / workers)))
+        inputs, level = list(input_paths), 0
+        finished = False
+        try:
+            with tracker.phase("serialize"):
+                while True:
+                    if stop_event.is_set():
+                        raise OperationCancelled()
+                    chunks = [inputs[i:i + chunk_size] for i in range(0, len(inputs), chunk_size)]
+                    final = len(chunks) == 1
+                    outputs = [output_path] if final else [os.path.join(folder, f"{level}-{i}.pdf") for i in range(len(chunks))]
+                    # only the output itself is recompressed
+                    futures = {pool.submit(_merge_chunk, chunk, chunk_output, dedup, optimize if final else None, optimize_threads): chunk
+                               for chunk, chunk_output in zip(chunks, outputs)}
+                    pending = set(futures)
+                    while pending:
+                        done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            pages, *chunk_counters = future.result()
+                            counters = tuple(total + value for total, value in zip(counters, chunk_counters))
+                            if level == 0:
+                                tracker.advance(pages=pages, files=len(futures[future]))
+                        if pending and stop_event.is_set():
+                            raise OperationCancelled()
+                    if final:
+                        break
+                    inputs, level, chunk_size = outputs, level + 1, fan_in
+            tracker.wrote(os.path.getsize(output_path))
+            finished = True
+            return counters
+        except OperationCancelled:
+            message_queue.put(("Merging operation was cancelled by the user.", True))
+            return None
+        finally:
+            if finished:
+                # the workers are idle; shutting down before returning also
+                # keeps the pool from outliving a process that exits next
+                _close_merge_pool(pool, folder)
+            else:
+                # running chunks (after a cancel or an error in another chunk)
+                # stop at their next write; they are waited for, and the
+                # intermediates removed, in the background
+                worker_stop_event.set()
+                threading.Thread(target=_close_merge_pool, args=(pool, folder)).start()
+
+    def delete_pages(self, input_paths, output_folder_path, pages_list, message_queue, stop_event, passthrough=False,
+                     optimize=None, optimize_threads=None, incremental=False, in_place=False, output_tag=None):
+        # incremental: append the removal to a copy of the input instead of
+        # rewriting it; in_place: append it to the input itself
+        tracker = self._tracker("delete", message_queue)
         try:
             if len(input_paths) != 1:
                 message_queue.put(("delete_pages() requires exactly one input PDF file.", True))
                 return 
-            output_path = self._create_outputfile_name(input_paths, output_folder_path, "_deleted.pdf", message_queue)
-            parsed_pages_list = self._parse_page_ranges(pages_list, message_queue)
-            pdf_writer = PyPDF2.PdfWriter()
-            pdf_reader = PyPDF2.PdfReader(input_paths[0])
-            for page in range(len(pdf_reader.pages)):
-                if stop_event.is_set():
+            output_path = self._create_outputfile_name(input_paths, output_folder_path, "_deleted.pdf", message_queue, output_tag)
+            incremental = incremental or in_place
+            tracker.start(inputs=input_paths, output_folder=output_folder_path, pages=pages_list, passthrough=passthrough, optimize=optimize,
+                          incremental=incremental, in_place=in_place)
+            with tracker.phase("parse"):
+                # only the page tree is read for an incremental update, so
+                # the file is mapped rather than loaded
+                pdf_reader = open_reader(input_paths[0], use_mmap=True) if incremental else self.document_cache.get(input_paths[0])
+            selection = self._parse_page_ranges(pages_list, len(pdf_reader.pages), message_queue)
+            kept_pages = list(selection.complement())
+            tracker.total_pages = len(kept_pages)
+            if incremental:
+                written = self._delete_incremental(pdf_reader, input_paths[0], selection, output_path, in_place,
+                                                   message_queue, tracker, stop_event)
+                if written is False:
                     message_queue.put(("Deletion operation was cancelled by the user.", True))
+                    tracker.end("cancelled")
                     return
-                if (page + 1) not in parsed_pages_list:
-                    pdf_writer.add_page(pdf_reader.pages[page])
-            with open(output_path, "wb") as output_pdf:
-                pdf_writer.write(output_pdf)
+                if written:
+                    tracker.end("ok")
+                    self._open_folder(os.path.dirname(os.path.abspath(input_paths[0])) if in_place else output_folder_path, message_queue)
+                    return
+            with self._compressor(optimize, optimize_threads) as compressor:
+                written = self._write_subset(pdf_reader, input_paths[0], kept_pages, output_path, tracker, stop_event, passthrough,
+                                             compressor=compressor)
+            if not written:
+                message_queue.put(("Deletion operation was cancelled by the user.", True))
+                tracker.end("cancelled")
+                return
+            tracker.end("ok")
             self._open_folder(output_folder_path, message_queue)
         except Exception as e:
             error_message = f"An error occurred: {str(e)}"
+            tracker.end("error", error=str(e))
             message_queue.put((error_message, True))
 
-    def extract_pages(self, input_paths, output_folder_path, pages_list, message_queue, stop_event):
+    def _delete_incremental(self, pdf_reader, input_path, deleted_pages, output_path, in_place, message_queue, tracker, stop_event):
+        # True when written, False if cancelled, None if the document has to
+        # be rewritten instead
+        deletion = IncrementalDeletion(pdf_reader, input_path)
+        with tracker.phase("assemble"):
+            update = deletion.build(deleted_pages)
+        if update is None:
+            message_queue.put(("This document cannot be updated incrementally and is rewritten instead.", False))
+            return None
+        if stop_event.is_set():
+            return False
+        if in_place:
+            with tracker.phase("flush"):
+                deletion.append(update)
+            tracker.wrote(len(update))
+            message_queue.put((f"Pages removed from {input_path} in place.", False))
+        else:
+            try:
+                self._write_output(lambda output_pdf: deletion.write_copy(update, output_pdf), output_path, tracker, stop_event)
+            except OperationCancelled:
+                return False
+        tracker.advance(pages=tracker.total_pages)
+        return True
+
+    def extract_pages(self, input_paths, output_folder_path, pages_list, message_queue, stop_event, passthrough=False,
+                      optimize=None, optimize_threads=None, output_tag=None):
+        tracker = self._tracker("extract", message_queue)
         try:
             if len(input_paths) != 1:
                 message_queue.put(("extract_pages() requires exactly one input PDF file.", True))
                 return
-            output_path = self._create_outputfile_name(input_paths, output_folder_path, "_extracted.pdf", message_queue)
-            parsed_pages_list = self._parse_page_ranges(pages_list, message_queue)
-            pdf_writer = PyPDF2.PdfWriter()
-            pdf_reader = PyPDF2.PdfReader(input_paths[0])
-            for page in range(len(pdf_reader.pages)):
-                if stop_event.is_set():
-                    message_queue.put(("Extraction operation was cancelled by the user.", True))
-                    return
-                if (page + 1) in parsed_pages_list:
-                    pdf_writer.add_page(pdf_reader.pages[page])
-            with open(output_path, "wb") as output_pdf:
-                pdf_writer.write(output_pdf)
+            output_path = self._create_outputfile_name(input_paths, output_folder_path, "_extracted.pdf", message_queue, output_tag)
+            tracker.start(inputs=input_paths, output_folder=output_folder_path, pages=pages_list, passthrough=passthrough, optimize=optimize)
+            with tracker.phase("parse"):
+                pdf_reader = self.document_cache.get(input_paths[0])
+            selection = self._parse_page_ranges(pages_list, len(pdf_reader.pages), message_queue)
+            tracker.total_pages = len(selection)
+            with self._compressor(optimize, optimize_threads) as compressor:
+                written = self._write_subset(pdf_reader, input_paths[0], list(selection), output_path, tracker, stop_event, passthrough,
+                                             compressor=compressor)
+            if not written:
+                message_queue.put(("Extraction operation was cancelled by the user.", True))
+                tracker.end("cancelled")
+                return
+            tracker.end("ok")
             self._open_folder(output_folder_path, message_queue)
         except Exception as e:
             error_message = f"An error occurred: {str(e)}"
+            tracker.end("error", error=str(e))
             message_queue.put((error_message, True))
 
-    def split_pdfs(self, input_paths, output_folder_path, pages_list, message_queue, stop_event):
+    def split_pdfs(self, input_paths, output_folder_path, pages_list, message_queue, stop_event, workers=1, passthrough=True,
+                   optimize=None, optimize_threads=None, output_tag=None):
+        # passthrough is on by default: the parts share one subset writer, so
+        # the objects they have in common are not serialized once per part;
+        # encrypted inputs fall back to PdfWriter on their own
+        tracker = self._tracker("split", message_queue)
         try:
             if len(input_paths) != 1:
                 message_queue.put(("split_pdfs() requires exactly one input PDF file.", True))
                 return
-            pdf_reader = PyPDF2.PdfReader(input_paths[0])
-            parsed_pages_list = self._parse_page_ranges(pages_list, message_queue)
-            split_points = sorted(list(set([1] + parsed_pages_list + [len(pdf_reader.pages) + 1])))
-            for i in range(len(split_points) - 1):
-                if stop_event.is_set():
-                    message_queue.put(("Splitting operation was cancelled by the user.", True))
+            tracker.start(inputs=input_paths, output_folder=output_folder_path, pages=pages_list,
+                          workers=workers, passthrough=passthrough, optimize=optimize)
+            with tracker.phase("parse"):
+                pdf_reader = self.document_cache.get(input_paths[0])
+            page_count = len(pdf_reader.pages)
+            selection = self._parse_page_ranges(pages_list, page_count, message_queue)
+            split_points = [0] + [page for page in selection if page > 0] + [page_count]
+            output_paths = self._create_outputfile_names(input_paths, output_folder_path,
+                                                         [f"_part{i}.pdf" for i in range(len(split_points) - 1)], message_queue, output_tag)
+            if output_paths is None:
+                tracker.end("error", error="The generated output path is too long.")
+                return
+            parts = list(zip(split_points, split_points[1:], output_paths))
+            tracker.total_pages = page_count
+            tracker.total_files = len(parts)
+            if workers > 1:
+                # the compression threads are shared out between the worker processes
+                threads = max(1, (optimize_threads or os.cpu_count() or 1) // workers)
+                if not self._split_parallel(input_paths[0], parts, workers, passthrough, message_queue, stop_event, tracker,
+                                            optimize, threads):
+                    tracker.end("cancelled")
                     return
-                start_1_indexed = split_points[i]
-                end_1_indexed = split_points[i + 1]
-                pdf_writer = PyPDF2.PdfWriter()
-                for page in pdf_reader.pages[start_1_indexed-1:end_1_indexed-1]:
-                    pdf_writer.add_page(page)
-                output_path = self._create_outputfile_name(input_paths, output_folder_path, f"_part{i}.pdf", message_queue)
-                with open(output_path, "wb") as output_pdf:
-                    pdf_writer.write(output_pdf)
+            else:
+                # one subset writer for all parts: every object shared between
+                # parts is scanned and encoded once
+                subset_writer = PageSubsetWriter(pdf_reader, input_paths[0]) if passthrough and not optimize else None
+                try:
+                    with self._compressor(optimize, optimize_threads) as compressor:
+                        for start, stop, output_path in parts:
+                            if stop_event.is_set() or not self._write_subset(pdf_reader, input_paths[0], range(start, stop), output_path,
+                                                                              tracker, stop_event, subset_writer=subset_writer,
+                                                                              compressor=compressor):
+                                message_queue.put(("Splitting operation was cancelled by the user.", True))
+                                tracker.end("cancelled")
+                                return
+                            tracker.advance(files=1)
+                finally:
+                    if subset_writer is not None:
+                        subset_writer.close()
+            tracker.end("ok")
             self._open_folder(output_folder_path, message_queue)
         except Exception as e:
             error_message = f"An error occurred: {str(e)}"
+            tracker.end("error", error=str(e))
             message_queue.put((error_message, True))
 
+    def _split_parallel(self, input_path, parts, workers, passthrough, message_queue, stop_event, tracker,
+                        optimize=None, optimize_threads=None):
+        # every worker process parses the source once and then writes whole parts;
+        # parts are reported as they finish, names stay tied to the part index.
+        # stop_event cannot cross process boundaries, so it is mirrored to an
+        # event the workers check while writing
+        worker_stop_event = multiprocessing.Event()
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_split_worker,
+                                   initargs=(input_path, self.use_mmap, passthrough, worker_stop_event, optimize, optimize_threads))
+        finished = False
+        try:
+            with tracker.phase("serialize"):
+                futures = {pool.submit(_write_split_part, start, stop, output_path): i
+                           for i, (start, stop, output_path) in enumerate(parts)}
+                pending = set(futures)
+                while pending:
+                    done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        start, stop, output_path = parts[futures[future]]
+                        message_queue.put((f"Part {futures[future]} written: {future.result()}", False))
+                        tracker.wrote(os.path.getsize(output_path))
+                        tracker.advance(pages=stop - start, files=1)
+                    if pending and stop_event.is_set():
+                        message_queue.put(("Splitting operation was cancelled by the user.", True))
+                        return False
+            finished = True
+            return True
+        finally:
+            if finished:
+                pool.shutdown()
+            else:
+                # running parts (after a cancel or an error in another part)
+                # stop at their next write and remove their temporary files;
+                # workers still parsing the source are waited for in the
+                # background
+                worker_stop_event.set()
+                threading.Thread(target=pool.shutdown, kwargs={"cancel_futures": True}).start()
+
+    def _tracker(self, operation, message_queue):
+        return OperationTracker(operation, message_queue, self.event_log)
+
+    def _write_subset(self, pdf_reader, input_path, pages, output_path, tracker, stop_event, passthrough=False, subset_writer=None,
+                      compressor=None):
+        # recompresses through the streaming writer when a compressor is
+        # given, copies the pages byte for byte when passthrough is on (or a
+        # shared subset writer is given) and the document allows it, otherwise
+        # goes through PdfWriter; returns False if cancelled
+        if compressor is not None:
+            try:
+                if self._write_output(lambda output_pdf: self._write_streaming(pdf_reader, pages, output_pdf, stop_event, compressor),
+                                      output_path, tracker, stop_event) is False:
+                    return False
+            except OperationCancelled:
+                return False
+            tracker.advance(pages=len(pages))
+            return True
+        if passthrough and subset_writer is None:
+            with PageSubsetWriter(pdf_reader, input_path) as subset_writer:
+                return self._write_subset(pdf_reader, input_path, pages, output_path, tracker, stop_event, subset_writer=subset_writer)
+        try:
+            if subset_writer is not None and self._write_output(lambda output_pdf: subset_writer.write(pages, output_pdf),
+                                                                output_path, tracker, stop_event):
+                tracker.advance(pages=len(pages))
+                return True
+            pdf_writer = PyPDF2.PdfWriter()
+            with tracker.phase("assemble"):
+                for page in pages:
+                    if stop_event.is_set():
+                        return False
+                    pdf_writer.add_page(pdf_reader.pages[page])
+                    tracker.advance(pages=1)
+            self._write_output(pdf_writer.write, output_path, tracker, stop_event)
+        except OperationCancelled:
+            return False
+        return True
+
+    def _write_streaming(self, pdf_reader, pages, output_pdf, stop_event, compressor):
+        pdf_writer = StreamingPdfWriter(output_pdf, compressor=compressor)
+        if not pdf_writer.add_reader(pdf_reader, pages, stop_event):
+            return False
+        pdf_writer.close()
+
+    def _write_output(self, write, output_path, tracker, stop_event):
+        # write(output_pdf) serializes the document into a temporary file that
+        # becomes output_path only if write does not return False; raises
+        # OperationCancelled as soon as a write sees stop_event set
+        with AtomicOutput(output_path, stop_event, tracker=tracker) as output_pdf:
+            with tracker.phase("serialize"):
+                result = write(output_pdf)
+            if result is False:
+                return result
+            with tracker.phase("flush"):
+                output_pdf.commit()
+        tracker.wrote(os.path.getsize(output_path))
+        return result
+
     def _open_folder(self, output_folder_path, message_queue):
+        if not self.open_folder:
+            message_queue.put(("Operation finished!", False))
+            return
         try:
             if platform.system() == "Windows":
                 os.startfile(output_folder_path)
@@ -0,0 +1,180 @@
+# structured progress events posted by the backend next to the status messages
+
+import json, queue, threading, time
+from collections import namedtuple
+from contextlib import contextmanager
+
+# kind is "start", "progress", "phase" or "end"; data holds the event fields.
+# Consumers of message_queue tell these apart from (message, is_error) tuples
+# with isinstance(item, OperationEvent).
+OperationEvent = namedtuple("OperationEvent", "kind operation timestamp data")
+
+# progress events are throttled so a fast operation cannot flood the queue
+PROGRESS_INTERVAL = 0.1
+
+
+def event_to_json(event):
+    return json.dumps({"kind": event.kind, "operation": event.operation,
+                       "timestamp": event.timestamp, **event.data})
+
+
+class EventLog:
+    """Append events as JSON lines to a file, shared by concurrent operations."""
+
+    def __init__(self, path):
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, event):
+        with self._lock:
+            self._file.write(event_to_json(event) + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class OperationTracker:
+    """Collect counters and phase timings of one operation and post them as events."""
+
+    def __init__(self, operation, message_queue, event_log=None):
+        self.operation = operation
+        self.message_queue = message_queue
+        self.event_log = event_log
+        self.total_pages = None
+        self.total_files = None
+        self.pages_done = 0
+        self.files_done = 0
+        self.bytes_written = 0
+        # the output being written, whose position counts as written too
+        self._output = None
+        self.phases = {}
+        self.started = time.perf_counter()
+        self._last_progress = 0.0
+        self._ended = False
+
+    def start(self, **data):
+        self.started = time.perf_counter()
+        self._post("start", data)
+
+    @contextmanager
+    def phase(self, name):
+        """Time a phase (parse, assemble, serialize, flush); repeated phases add up."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+            self._post("phase", {"phase": name, "seconds": elapsed})
+
+    def advance(self, pages=0, files=0):
+        self.pages_done += pages
+        self.files_done += files
+        now = time.perf_counter()
+        finished = ((self.total_pages is not None and self.pages_done >= self.total_pages)
+                    or (self.total_files is not None and self.files_done >= self.total_files))
+        if finished or now - self._last_progress >= PROGRESS_INTERVAL:
+            self._last_progress = now
+            self._post("progress", self._progress(now))
+
+    def writing(self, output):
+        """Called by AtomicOutput on every write; progress then includes its bytes."""
+        self._output = output
+        now = time.perf_counter()
+        if now - self._last_progress >= PROGRESS_INTERVAL:
+            self._last_progress = now
+            self._post("progress", self._progress(now))
+
+    def wrote(self, byte_count):
+        # a committed output, which no longer counts as being written
+        self.bytes_written += byte_count
+        self._output = None
+
+    def end(self, status, **data):
+        """Post the final event once; status is "ok", "cancelled" or "error"."""
+        if self._ended:
+            return
+        self._ended = True
+        elapsed = time.perf_counter() - self.started
+        self._post("end", {
+            "status": status,
+            "seconds": elapsed,
+            "pages": self.pages_done,
+            "files": self.files_done,
+            "bytes_written": self.bytes_written,
+            "pages_per_second": self.pages_done / elapsed if elapsed else 0.0,
+            "bytes_per_second": self.bytes_written / elapsed if elapsed else 0.0,
+            "phases": dict(self.phases),
+            **data,
+        })
+
+    def _progress(self, now):
+        elapsed = now - self.started
+        rate = self.pages_done / elapsed if elapsed else 0.0
+        progress = {
+            "pages_done": self.pages_done,
+            "total_pages": self.total_pages,
+            "files_done": self.files_done,
+            "total_files": self.total_files,
+            "pages_per_second": rate,
+            "bytes_written": self.bytes_written + self._output_position(),
+            "eta_seconds": None,
+        }
+        if self.total_pages and rate:
+            progress["eta_seconds"] = (self.total_pages - self.pages_done) / rate
+        elif self.total_files and self.files_done:
+            progress["eta_seconds"] = (self.total_files - self.files_done) * elapsed / self.files_done
+        return progress
+
+    def _output_position(self):
+        output = self._output
+        if output is None:
+            return 0
+        try:
+            return output.tell()
+        except (ValueError, OSError):
+            # closed by a cancellation
+            return 0
+
+    def _post(self, kind, data):
+        event = OperationEvent(kind, self.operation, time.time(), data)
+        self.message_queue.put(event)
+        if self.event_log is not None:
+            self.event_log.write(event)
+
+
+class WakeupQueue(queue.Queue):
+    """Queue that calls notify() once per burst of puts instead of being polled.
+
+    After the first put, further puts do not notify again until the consumer
+    has called drain(), so a thousand messages posted between two repaints
+    cost one wakeup. notify() is called outside the queue's lock and may be
+    called from any thread.
+    """
+
+    def __init__(self, notify):
+        super().__init__()
+        self.notify = notify
+        self._wakeup_lock = threading.Lock()
+        self._wakeup_pending = False
+
+    def put(self, item, block=True, timeout=None):
+        super().put(item, block, timeout)
+        with self._wakeup_lock:
+            if self._wakeup_pending:
+                return
+            self._wakeup_pending = True
+        self.notify()
+
+    def drain(self):
+        """Return every queued item; the next put notifies again."""
+        with self._wakeup_lock:
+            self._wakeup_pending = False
+        items = []
+        while True:
+            try:
+                items.append(self.get_nowait())
+            except queue.Empty:
+                return items
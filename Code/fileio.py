@@ -0,0 +1,221 @@
+# input and output file handling for the backend
+
+import mmap, os, stat, tempfile, threading
+import PyPDF2
+
+# outputs are written in large blocks instead of the default 8 KB buffer
+OUTPUT_BUFFER_SIZE = 4 * 1024 * 1024
+COPY_CHUNK_SIZE = 16 * 1024 * 1024
+# mkstemp creates files only the owner can read; outputs get the mode a
+# plain open() would have given them. The umask can only be read by setting
+# it, so that happens once at import, before any worker thread exists
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+
+def map_input(path):
+    """Return a read-only memory map of path, or None if it cannot be mapped.
+
+    PdfReader accepts the map as its stream, so the file is paged in by the OS
+    on demand instead of being copied into a BytesIO up front. The map stays
+    valid after the file handle is closed.
+    """
+    with open(path, "rb") as input_file:
+        try:
+            return mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # empty files and some special filesystems cannot be mapped
+            return None
+
+
+def read_startxref(mapped):
+    """Offset after the last startxref keyword of a mapped PDF, or None."""
+    position = mapped.rfind(b"startxref", max(0, len(mapped) - 1024))
+    if position < 0:
+        return None
+    digits = mapped[position + len(b"startxref"):position + 64].split()
+    return int(digits[0]) if digits and digits[0].isdigit() else None
+
+
+def open_reader(path, use_mmap=False):
+    if use_mmap:
+        mapped = map_input(path)
+        if mapped is not None:
+            return PyPDF2.PdfReader(mapped)
+    return PyPDF2.PdfReader(path)
+
+
+def open_output(path):
+    return open(path, "wb", buffering=OUTPUT_BUFFER_SIZE)
+
+
+class OperationCancelled(Exception):
+    """Raised by AtomicOutput.write once the operation's stop event is set."""
+
+
+class AtomicOutput:
+    """Binary output that only appears under its final name once complete.
+
+    Everything is written to a hidden temporary file in the target folder;
+    commit() flushes and fsyncs it and renames it to path, so folder
+    watchers never see a partial PDF. An existing file at path is only
+    replaced (keeping its permissions) with replace=True; otherwise commit
+    raises FileExistsError. New files get the permissions open() gives them.
+    Without a commit (an error, a cancellation, an unsupported passthrough)
+    the temporary file is removed on exit. Every write checks stop_event, so
+    a long serialization stops at the next object instead of running to the
+    end, and is reported to tracker (an OperationTracker), whose progress
+    events count the bytes.
+    """
+
+    def __init__(self, path, stop_event=None, replace=False, tracker=None):
+        self.path = path
+        self.stop_event = stop_event
+        self.replace = replace
+        self.tracker = tracker
+        folder, name = os.path.split(os.path.abspath(path))
+        handle, self.temporary_path = tempfile.mkstemp(prefix=f".{name}.", suffix=".part", dir=folder)
+        os.close(handle)
+        self._file = open_output(self.temporary_path)
+        self.committed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if not self.committed:
+            self.discard()
+
+    def write(self, data):
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise OperationCancelled()
+        written = self._file.write(data)
+        if self.tracker is not None:
+            self.tracker.writing(self)
+        return written
+
+    def tell(self):
+        return self._file.tell()
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        return self._file.seek(offset, whence)
+
+    def flush(self):
+        self._file.flush()
+
+    def fileno(self):
+        return self._file.fileno()
+
+    def commit(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.chmod(self.temporary_path, _output_mode(self.path) if self.replace else 0o666 & ~_UMASK)
+        if self.replace:
+            os.replace(self.temporary_path, self.path)
+        else:
+            _rename_new(self.temporary_path, self.path)
+        self.committed = True
+        _sync_folder(os.path.dirname(os.path.abspath(self.path)))
+
+    def discard(self):
+        # flushing and unlinking hundreds of megabytes of a cancelled output
+        # takes longer than the stop button should, so it happens in the background
+        threading.Thread(target=_remove_partial, args=(self._file, self.temporary_path)).start()
+
+
+def _output_mode(path):
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        return 0o666 & ~_UMASK
+
+
+def _rename_new(source, destination):
+    # a rename that fails with FileExistsError instead of replacing a file
+    # created since the name was chosen (by another job, say)
+    if os.name == "nt":
+        # never replaces on Windows
+        os.rename(source, destination)
+        return
+    try:
+        os.link(source, destination)
+    except FileExistsError:
+        raise
+    except OSError:
+        # no hard links on this filesystem (FAT, some network shares): the
+        # name is claimed first, so at worst an empty file shows up briefly
+        os.close(os.open(destination, os.O_WRONLY | os.O_CREAT | os.O_EXCL))
+        os.replace(source, destination)
+        return
+    os.remove(source)
+
+
+def _remove_partial(partial_file, path):
+    partial_file.close()
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _sync_folder(folder):
+    # makes the rename itself durable; folders cannot be opened on Windows
+    try:
+        handle = os.open(folder, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(handle)
+    except OSError:
+        pass
+    finally:
+        os.close(handle)
+
+
+def copy_range(source, destination, offset, length):
+    """Copy length bytes starting at offset from one binary file to another.
+
+    Uses os.copy_file_range or os.sendfile where the platform supports
+    file-to-file copies so the bytes never pass through Python; on
+    filesystems with reflinks (btrfs, XFS) copy_file_range shares the blocks
+    instead of copying them. Falls back to chunked reads.
+    """
+    destination.flush()
+    destination.seek(0, os.SEEK_END)
+    for kernel_copy in _KERNEL_COPIES:
+        try:
+            while length > 0:
+                # an empty write lets AtomicOutput check for cancellation
+                destination.write(b"")
+                sent = kernel_copy(source.fileno(), destination.fileno(), offset, min(length, COPY_CHUNK_SIZE))
+                if sent == 0:
+                    break
+                offset += sent
+                length -= sent
+        except OSError:
+            # not supported between these files; the next method continues
+            continue
+        break
+    destination.seek(0, os.SEEK_END)
+    if length == 0:
+        return
+    source.seek(offset)
+    while length > 0:
+        chunk = source.read(min(length, COPY_CHUNK_SIZE))
+        if not chunk:
+            raise EOFError("source file ended before the requested byte range")
+        destination.write(chunk)
+        offset += len(chunk)
+        length -= len(chunk)
+
+
+def _copy_file_range(source_fd, destination_fd, offset, count):
+    return os.copy_file_range(source_fd, destination_fd, count, offset)
+
+
+def _sendfile(source_fd, destination_fd, offset, count):
+    return os.sendfile(destination_fd, source_fd, offset, count)
+
+
+_KERNEL_COPIES = [copy for name, copy in (("copy_file_range", _copy_file_range), ("sendfile", _sendfile)) if hasattr(os, name)]
@@ -1,29 +1,69 @@
 # main function
 
-import queue, threading
+import functools, multiprocessing, os, queue
 import tkinter as tk
 from tkinter import filedialog, ttk
-from editor import  PDFEditorBackend
+from events import OperationEvent, WakeupQueue
 from lang import LanguageManager
+from logview import LogView
+from scheduler import JobScheduler
+from selection import PageSelection, out_of_range, parse_page_ranges
+
+# job priorities offered in the gui, highest first
+PRIORITIES = [('priority_high', 1), ('priority_normal', 0), ('priority_low', -1)]
+# optimize levels offered in the gui, off first
+OPTIMIZE_CHOICES = [('optimize_off', None), ('optimize_fast', 'fast'), ('optimize_balanced', 'balanced'), ('optimize_smallest', 'smallest')]
+# finished jobs kept in the job list
+FINISHED_JOB_ROWS = 200
 
 class PDFeditor_GUI:
 
     def __init__(self, window):
         self.window = window
         self.window.title("MDES-PDF-Editor")
-        self.window.geometry("820x550")
+        self.window.geometry("820x720")
         self.window.resizable(False, False)
 
-        self.message_queue = queue.Queue()
-        self.stop_event = threading.Event() 
-        self.pb = PDFEditorBackend()
+        # the backend threads wake the event loop through a virtual event
+        # only when they post something, instead of the queue being polled
+        self.message_queue = WakeupQueue(self._wake)
+        self.window.bind("<<MessagesPosted>>", self._process_queue)
+        # page counts of added PDFs, filled in the background, so page ranges
+        # are checked before a job is queued
+        self.index = None
+        self.window.bind("<<IndexReady>>", self._update_range_preview)
+        # the backend and the index are loaded by _load_backend()
+        self.pb = None
+        # every operation is a job with its own stop event; several run at once
+        self.scheduler = JobScheduler(self.message_queue)
+        # ids of finished job rows, oldest first
+        self.finished_jobs = {}
         self.lm = LanguageManager() 
         self.lm.set_lang('English')
-        self.processing = False
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
 
         self.setup_layout()
         self._update_status(self.lm.trans('welcome_info'))
-        self._process_queue()
+        self.window.bind("<Expose>", self._first_paint)
+
+    def _first_paint(self, event):
+        if event.widget is not self.window:
+            return
+        self.window.unbind("<Expose>")
+        # the rest of the window is drawn before the backend is loaded
+        self.window.update_idletasks()
+        self.window.after_idle(self._load_backend)
+
+    def _load_backend(self):
+        # PyPDF2 comes in with the backend and is the slowest part of starting
+        # up, so it is imported once the window is on screen, or by the first
+        # action that needs it if that comes sooner
+        if self.pb is None:
+            from docindex import DocumentIndex
+            from editor import PDFEditorBackend
+            self.index = DocumentIndex()
+            self.pb = PDFEditorBackend()
+        return self.pb
        
 
     def setup_layout(self):
@@ -55,7 +95,9 @@ class PDFeditor_GUI:
         # Row 4: "Page Ranges" Section
         self.page_ranges = tk.Entry(self.window, width=50)
         self.page_ranges.grid(row=4, column=1, padx=10, pady=5, sticky="ew")
-        tk.Label(self.window, text=self.lm.trans('label_page_range_example')).grid(row=4, column=2, padx=10, pady=5, sticky="ew")
+        self.page_ranges.bind("<KeyRelease>", self._update_range_preview)
+        self.range_preview = tk.Label(self.window, text=self.lm.trans('label_page_range_example'))
+        self.range_preview.grid(row=4, column=2, padx=10, pady=5, sticky="ew")
 
         # Row 6-9: "Merge", "Delete", "Extract", "Split"
         button_texts = ["Merge", "Delete", "Extract", "Split"]
@@ -64,17 +106,42 @@ class PDFeditor_GUI:
             button.grid(row=row, column=2, padx=5, pady=20, sticky="ew")
             self.buttons[text.lower()] = button
 
-        # Row 5: "Info Dashboard" Label
+        # Row 5: "Info Dashboard" Label, the priority and optimize level of new jobs
         tk.Label(self.window, text=self.lm.trans('label_message_box'), font=("Arial", 14, "bold")).grid(row=5, column=0, columnspan=2, padx=10, pady=10, sticky="ew")
+        job_options = tk.Frame(self.window)
+        job_options.grid(row=5, column=2, padx=10, pady=10, sticky="ew")
+        self.priority = ttk.Combobox(job_options, state="readonly", width=12, values=[self.lm.trans(key) for key, _ in PRIORITIES])
+        self.priority.current(1)
+        self.priority.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.optimize = ttk.Combobox(job_options, state="readonly", width=12, values=[self.lm.trans(key) for key, _ in OPTIMIZE_CHOICES])
+        self.optimize.current(0)
+        self.optimize.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 0))
 
         # Row 6-9: Message Box
-        self.message_box = tk.Text(self.window, height=5, width=60)
+        self.message_box = LogView(self.window, height=5, width=60)
         self.message_box.grid(row=6, rowspan=4, column=0, columnspan=2, padx=10, pady=10, sticky="nesw")
 
-        # Row 10 Stop Button
+        # Row 10: Progress bar, progress text and Stop Button
+        self.progress_bar = ttk.Progressbar(self.window, mode="determinate")
+        self.progress_bar.grid(row=10, column=0, padx=10, pady=10, sticky="ew")
+        self.progress_label = tk.Label(self.window, text="", anchor="w")
+        self.progress_label.grid(row=10, column=1, padx=10, pady=10, sticky="ew")
         self.stop_button = ttk.Button(self.window, text=self.lm.trans('stop'), command=self.stop)
-        self.stop_button.grid(row=10, column=0, columnspan=3, padx=10, pady=10, sticky="ew")
+        self.stop_button.grid(row=10, column=2, padx=10, pady=10, sticky="ew")
         self.buttons["stop"] = self.stop_button
+
+        # Row 11: Job list; Stop cancels the selected jobs, or all of them
+        job_frame = tk.Frame(self.window)
+        job_frame.grid(row=11, column=0, columnspan=3, padx=10, pady=(0, 10), sticky="nesw")
+        columns = ("job", "operation", "files", "priority", "status", "progress")
+        self.job_list = ttk.Treeview(job_frame, columns=columns, show="headings", height=6)
+        for column, width in zip(columns, (40, 110, 320, 80, 90, 130)):
+            self.job_list.heading(column, text=self.lm.trans(f"job_{column}"))
+            self.job_list.column(column, width=width, stretch=column == "files")
+        job_scrollbar = ttk.Scrollbar(job_frame, command=self.job_list.yview)
+        self.job_list.config(yscrollcommand=job_scrollbar.set)
+        job_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.job_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
     
     def add_pdfs(self):
         self.file_paths = filedialog.askopenfilenames(
@@ -86,55 +153,143 @@ class PDFeditor_GUI:
         for path in self.file_paths:
             if path not in current_paths_list:
                 self.input_PDFs.insert(tk.END, path)
+        self._load_backend()
+        self.index.prefetch(self.file_paths, self._index_ready)
+        self._update_range_preview()
+
+    def _index_ready(self, path, entry):
+        # called from the index thread
+        try:
+            self.window.event_generate("<<IndexReady>>", when="tail")
+        except (RuntimeError, tk.TclError):
+            pass
+
+    def _check_page_ranges(self, input_path, page_ranges_list):
+        # (selection, error messages) against the indexed page count, or
+        # (None, []) while the document is not indexed yet
+        entry = self.index.lookup(input_path)
+        if entry is None:
+            return None, []
+        errors = queue.Queue()
+        specs = parse_page_ranges(page_ranges_list, errors)
+        messages = [message for message, _ in errors.queue]
+        beyond = out_of_range(specs, entry["page_count"])
+        if beyond:
+            messages.append(self.lm.trans('error_page_out_of_range').format(
+                page_ranges=", ".join(beyond), page_count=entry["page_count"]))
+        return PageSelection(specs, entry["page_count"]), messages
+
+    def _update_range_preview(self, event=None):
+        text = self.lm.trans('label_page_range_example')
+        input_paths = self.input_PDFs.get(0, tk.END)
+        if len(input_paths) == 1 and self.index is not None:
+            entry = self.index.lookup(input_paths[0])
+            page_ranges_list = [p.strip() for p in self.page_ranges.get().split(',') if p.strip()]
+            if entry is not None and page_ranges_list:
+                selection, messages = self._check_page_ranges(input_paths[0], page_ranges_list)
+                text = messages[0] if messages else self.lm.trans('preview_selected_pages').format(
+                    selected=len(selection), page_count=entry["page_count"])
+            elif entry is not None:
+                text = self.lm.trans('preview_page_count').format(page_count=entry["page_count"])
+        self.range_preview.config(text=text)
 
     def browse_folder(self):
         self.folder_path = filedialog.askdirectory(title=self.lm.trans('title_browse_folder'))
         if self.folder_path:
             self.output_folder.insert(0, self.folder_path)
 
-    def _disable_buttons(self):
-        for name, button in self.buttons.items():
-            if name != "stop":
-                button.config(state=tk.DISABLED)
-        self.window.config(cursor="wait")
-
-    def _enable_buttons(self):
-        for name, button in self.buttons.items():
-            if name != "stop":
-                button.config(state=tk.NORMAL)
-            else:
-                button.config(state=tk.DISABLED)
-        self.window.config(cursor="")
-    
     def _clear_entries(self):
         self.input_PDFs.delete(0, tk.END)
         self.page_ranges.delete(0, tk.END)
         # self.message_box.delete("1.0", tk.END)
 
     def _update_status(self, message, is_error=False):
-        self.message_box.insert("1.0", message + "\n---")
-        self.message_box.config(fg="red" if is_error else "green")
-    
-    def _process_queue(self):
+        self.message_box.append(message, is_error)
+        self.message_box.refresh()
+
+    def _wake(self):
+        # called from backend threads; Tk hands the event to the main loop
         try:
-            while not self.message_queue.empty():
-                message, is_error = self.message_queue.get_nowait()
-                if "Operation finished!" in message or is_error:
-                    self._update_status(self.lm.trans('stop_msg'))
-                    self._enable_buttons()
-                    self._clear_entries()
-                    self.processing = False
-                    self.stop_event.clear()
-                else:
-                    self._update_status(message, is_error)
-
-        except queue.Empty:
+            self.window.event_generate("<<MessagesPosted>>", when="tail")
+        except (RuntimeError, tk.TclError):
+            # the window is closing
             pass
 
-        finally:
-            self.window.after(50, self._process_queue)
+    def _process_queue(self, event=None):
+        # one pass per burst of messages: the log, the progress bar and every
+        # changed job row are repainted once
+        changed_jobs = {}
+        latest_event = None
+        for job, item in self.message_queue.drain():
+            changed_jobs[job.id] = job
+            if item is None:
+                continue
+            if isinstance(item, OperationEvent):
+                if item.kind != "phase":
+                    latest_event = item
+                continue
+            message, is_error = item
+            if "Operation finished!" in message:
+                message = self.lm.trans('stop_msg')
+            self.message_box.append(f"#{job.id} {self.lm.trans(job.operation)}: {message}", is_error)
+        if latest_event is not None:
+            self._show_progress(latest_event)
+        for job in changed_jobs.values():
+            self._show_job(job)
+        self.message_box.refresh(force=False)
+        self.stop_button.config(state=tk.NORMAL if self.scheduler.active() else tk.DISABLED)
+
+    def _show_job(self, job):
+        iid = str(job.id)
+        values = (job.id, self.lm.trans(job.operation), ", ".join(os.path.basename(path) for path in job.input_paths),
+                  self.lm.trans(self._priority_key(job.priority)), self.lm.trans(f"job_{job.status}"), self._job_progress(job))
+        if self.job_list.exists(iid):
+            self.job_list.item(iid, values=values)
+        else:
+            self.job_list.insert("", tk.END, iid=iid, values=values)
+        if job.finished and iid not in self.finished_jobs:
+            self.finished_jobs[iid] = None
+            while len(self.finished_jobs) > FINISHED_JOB_ROWS:
+                oldest = next(iter(self.finished_jobs))
+                del self.finished_jobs[oldest]
+                self.job_list.delete(oldest)
+
+    def _job_progress(self, job):
+        event = job.last_event
+        if event is None or event.kind == "start":
+            return ""
+        data = event.data
+        if event.kind == "end":
+            return f"{data['pages']} / {data['seconds']:.1f} s"
+        if data["total_pages"]:
+            return f"{data['pages_done']}/{data['total_pages']}"
+        return f"{data['files_done']}/{data['total_files']}"
+
+    def _priority_key(self, priority):
+        return next(key for key, value in PRIORITIES if value == priority)
                
-    def _run_threaded_operation(self, target_method, requires_page_ranges=False):
+    def _show_progress(self, event):
+        if event.kind == "start":
+            self.progress_bar.config(mode="determinate", value=0, maximum=1)
+            self.progress_label.config(text="")
+        elif event.kind == "progress":
+            data = event.data
+            if data["total_pages"]:
+                done, total = data["pages_done"], data["total_pages"]
+            else:
+                done, total = data["files_done"], data["total_files"] or 1
+            self.progress_bar.config(maximum=max(total, 1), value=done)
+            eta = data["eta_seconds"]
+            self.progress_label.config(text=self.lm.trans('progress_running').format(
+                done=done, total=total, rate=data["pages_per_second"], eta=eta if eta is not None else 0))
+        elif event.kind == "end":
+            data = event.data
+            self.progress_bar.config(value=self.progress_bar["maximum"] if data["status"] == "ok" else 0)
+            self.progress_label.config(text=self.lm.trans('progress_done').format(
+                pages=data["pages"], seconds=data["seconds"], rate=data["pages_per_second"],
+                megabytes=data["bytes_written"] / 1e6))
+
+    def _run_threaded_operation(self, operation, target_method, requires_page_ranges=False):
 
         input_paths = list(self.input_PDFs.get(0, tk.END))  
         output_folder = self.output_folder.get().strip()
@@ -154,42 +309,57 @@ class PDFeditor_GUI:
                 self._update_status(self.lm.trans('error_not_page_ranges'), is_error=True)
                 return
             page_ranges_list = [p.strip() for p in page_ranges.split(',') if p.strip()]
+            if len(input_paths) == 1:
+                _, messages = self._check_page_ranges(input_paths[0], page_ranges_list)
+                if messages:
+                    for message in messages:
+                        self._update_status(message, is_error=True)
+                    return
             args_tuple += (page_ranges_list,)
             self._update_status(self.lm.trans('status_with_page_range').format(input_paths=input_paths, output_folder=output_folder, page_ranges=page_ranges_list))
         else:
             self._update_status(self.lm.trans('status_no_page_range').format(input_paths=input_paths, output_folder=output_folder))
 
-        self.processing = True
-        self.stop_event.clear()
-        self._disable_buttons()
-
-        # Create and start the thread
-        operation_thread = threading.Thread(target=target_method, args=args_tuple+ (self.message_queue, self.stop_event))
-        operation_thread.daemon = True
-        operation_thread.start()
-
-        # self.window.after(100, self._process_queue)
+        # queued behind or next to the jobs already running; the entries are
+        # cleared so the next job can be set up right away
+        priority = PRIORITIES[self.priority.current()][1]
+        optimize = OPTIMIZE_CHOICES[self.optimize.current()][1]
+        if optimize:
+            target_method = functools.partial(target_method, optimize=optimize)
+        self.scheduler.submit(operation, target_method, args_tuple, input_paths, priority)
+        self._clear_entries()
+        self._update_range_preview()
 
     def merge(self):
-        self._run_threaded_operation(self.pb.merge_pdfs)
+        self._run_threaded_operation('merge', self._load_backend().merge_pdfs)
 
     def delete(self):
-        self._run_threaded_operation(self.pb.delete_pages, requires_page_ranges=True)
+        self._run_threaded_operation('delete', self._load_backend().delete_pages, requires_page_ranges=True)
 
     def extract(self):
-        self._run_threaded_operation(self.pb.extract_pages, requires_page_ranges=True)
+        self._run_threaded_operation('extract', self._load_backend().extract_pages, requires_page_ranges=True)
 
     def split(self):
-        self._run_threaded_operation(self.pb.split_pdfs, requires_page_ranges=True)
+        self._run_threaded_operation('split', self._load_backend().split_pdfs, requires_page_ranges=True)
 
 
     def stop(self):
-        if self.processing:
+        selected = {int(iid) for iid in self.job_list.selection()}
+        jobs = [job for job in self.scheduler.active() if not selected or job.id in selected]
+        if jobs:
             self._update_status(self.lm.trans('status_stop'), False)
-            self.stop_event.set()
+            for job in jobs:
+                self.scheduler.cancel(job)
+
+    def close(self):
+        self.scheduler.shutdown()
+        if self.index is not None:
+            self.index.close()
+        self.window.destroy()
 
     
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     window = tk.Tk()
     app = PDFeditor_GUI(window)
     window.mainloop()
\ No newline at end of file
@@ -0,0 +1,205 @@
+# page deletion written as an incremental update instead of a new document
+
+import os, zlib
+from io import BytesIO
+from PyPDF2.generic import ArrayObject, ByteStringObject, DictionaryObject, IndirectObject, NameObject, NumberObject
+from fileio import copy_range, map_input, read_startxref
+
+
+class IncrementalDeletion:
+    """Remove pages by appending an update section to the document.
+
+    Only the page tree nodes above removed pages are written again, with the
+    removed kids left out and lower counts, followed by an xref section that
+    also frees the removed pages and a trailer pointing back at the previous
+    one (/Prev). Everything else stays where it is, so the cost scales with
+    the number of changed objects instead of the file size. The removed pages
+    keep their space until the document is rewritten (a delete without
+    incremental, or with optimize). The section uses an xref stream when the
+    document's last section is one.
+
+    Encrypted documents and files whose last xref section cannot be found
+    are not supported; build() returns None for them.
+    """
+
+    def __init__(self, reader, input_path):
+        self.reader = reader
+        self.input_path = input_path
+        # length of the document the update is appended to
+        self.base = None
+
+    def build(self, deleted_pages):
+        """The update section removing the 0-indexed deleted_pages, or None."""
+        if self.reader.is_encrypted:
+            return None
+        mapped = map_input(self.input_path)
+        if mapped is None:
+            return None
+        try:
+            self.base = len(mapped)
+            previous = read_startxref(mapped)
+            if previous is None:
+                return None
+            xref_stream = mapped[previous:previous + 4] != b"xref"
+            ends_with_newline = mapped[-1:] in (b"\n", b"\r")
+        finally:
+            mapped.close()
+        pages = self.reader.trailer["/Root"].raw_get("/Pages")
+        if not isinstance(pages, IndirectObject):
+            return None
+        self._deleted = set(deleted_pages)
+        self._next_page = 0
+        self._changed = {}
+        self._freed = []
+        try:
+            _, removed = self._prune(pages, set())
+        except ValueError:
+            return None
+        if not removed:
+            self._changed[(pages.idnum, pages.generation)] = pages.get_object()
+
+        update = BytesIO()
+        if not ends_with_newline:
+            update.write(b"\n")
+        entries = {}
+        for (idnum, generation), node in sorted(self._changed.items()):
+            entries[idnum] = (1, self.base + update.tell(), generation)
+            update.write(b"%d %d obj\n" % (idnum, generation))
+            node.write_to_stream(update, None)
+            update.write(b"\nendobj\n")
+        for idnum, generation in self._freed:
+            # the highest generation cannot be freed again
+            if generation < 65535:
+                entries[idnum] = (0, 0, generation + 1)
+        size = max([_document_size(self.reader)] + [idnum + 1 for idnum in entries])
+        trailer = DictionaryObject()
+        for key in ("/Root", "/Info"):
+            if key in self.reader.trailer:
+                trailer[NameObject(key)] = self.reader.trailer.raw_get(key)
+        file_id = self.reader.trailer.get("/ID")
+        if file_id is not None and len(file_id) == 2:
+            # the first identifier stays, the second changes with every update
+            trailer[NameObject("/ID")] = ArrayObject([file_id[0], ByteStringObject(os.urandom(16))])
+        trailer[NameObject("/Prev")] = NumberObject(previous)
+        if xref_stream:
+            _write_xref_stream(update, self.base, entries, size, trailer)
+        else:
+            _write_xref_table(update, self.base, entries, size, trailer)
+        return update.getvalue()
+
+    def write_copy(self, update, output):
+        """Write the document followed by update to the binary file output."""
+        with open(self.input_path, "rb") as source:
+            copy_range(source, output, 0, self.base)
+        output.write(update)
+
+    def append(self, update):
+        """Append update to the document itself."""
+        with open(self.input_path, "r+b") as target:
+            if target.seek(0, os.SEEK_END) != self.base:
+                raise OSError(f"{self.input_path} changed while its pages were being removed.")
+            target.write(update)
+            target.flush()
+            os.fsync(target.fileno())
+
+    def _prune(self, reference, seen):
+        # (kept pages, removed pages) below reference, counted in the order
+        # PdfReader numbers the pages; rewritten nodes go to _changed
+        key = (reference.idnum, reference.generation)
+        if key in seen:
+            raise ValueError("The page tree contains a cycle.")
+        seen.add(key)
+        node = reference.get_object()
+        node_type = node.get("/Type", "/Pages")
+        if node_type == "/Page":
+            index = self._next_page
+            self._next_page += 1
+            if index in self._deleted:
+                self._freed.append(key)
+                return 0, 1
+            return 1, 0
+        if node_type != "/Pages":
+            return 0, 0
+        if "/Kids" not in node:
+            raise ValueError("Page tree node without /Type or /Kids.")
+        kids = ArrayObject()
+        kept = removed = 0
+        for kid in node["/Kids"]:
+            if not isinstance(kid, IndirectObject):
+                raise ValueError("Page tree kids must be indirect objects.")
+            kid_kept, kid_removed = self._prune(kid, seen)
+            kept += kid_kept
+            removed += kid_removed
+            if kid_kept or not kid_removed:
+                kids.append(kid)
+            elif (kid.idnum, kid.generation) not in self._freed:
+                # an emptied intermediate node
+                self._changed.pop((kid.idnum, kid.generation), None)
+                self._freed.append((kid.idnum, kid.generation))
+        if removed:
+            node = DictionaryObject(node)
+            node[NameObject("/Kids")] = kids
+            node[NameObject("/Count")] = NumberObject(kept)
+            self._changed[key] = node
+        return kept, removed
+
+
+def _document_size(reader):
+    # one past the highest object number in use; PdfReader leaves /Size out
+    # of the trailer of documents with xref streams
+    size = int(reader.trailer.get("/Size", 0))
+    for entries in reader.xref.values():
+        size = max([size] + [idnum + 1 for idnum in entries])
+    return max([size] + [idnum + 1 for idnum in reader.xref_objStm])
+
+
+def _subsections(entries):
+    # runs of consecutive object numbers: [(first, [number, ...]), ...]
+    runs = []
+    for idnum in sorted(entries):
+        if runs and runs[-1][0] + len(runs[-1][1]) == idnum:
+            runs[-1][1].append(idnum)
+        else:
+            runs.append((idnum, [idnum]))
+    return runs
+
+
+def _write_xref_table(update, base, entries, size, trailer):
+    xref_offset = base + update.tell()
+    update.write(b"xref\n")
+    for first, numbers in _subsections(entries):
+        update.write(b"%d %d\n" % (first, len(numbers)))
+        for idnum in numbers:
+            kind, offset, generation = entries[idnum]
+            update.write(b"%010d %05d %s \n" % (offset, generation, b"n" if kind else b"f"))
+    trailer[NameObject("/Size")] = NumberObject(size)
+    update.write(b"trailer\n")
+    trailer.write_to_stream(update, None)
+    update.write(b"\nstartxref\n%d\n%%%%EOF\n" % xref_offset)
+
+
+def _write_xref_stream(update, base, entries, size, trailer):
+    # the stream is an object itself and takes the next free number
+    xref_id = size
+    xref_offset = base + update.tell()
+    entries = dict(entries)
+    entries[xref_id] = (1, xref_offset, 0)
+    width = max(1, (xref_offset.bit_length() + 7) // 8)
+    rows = bytearray()
+    index = []
+    for first, numbers in _subsections(entries):
+        index.append(f"{first} {len(numbers)}")
+        for idnum in numbers:
+            kind, offset, generation = entries[idnum]
+            rows += bytes([kind]) + offset.to_bytes(width, "big") + generation.to_bytes(2, "big")
+    data = zlib.compress(bytes(rows))
+    trailer[NameObject("/Size")] = NumberObject(xref_id + 1)
+    update.write(f"{xref_id} 0 obj\n<< /Type /XRef /W [1 {width} 2] /Index [{' '.join(index)}] ".encode())
+    for key, value in trailer.items():
+        key.write_to_stream(update, None)
+        update.write(b" ")
+        value.write_to_stream(update, None)
+        update.write(b" ")
+    update.write(f"/Filter /FlateDecode /Length {len(data)} >>\nstream\n".encode())
+    update.write(data)
+    update.write(b"\nendstream\nendobj\nstartxref\n%d\n%%%%EOF\n" % xref_offset)
@@ -3,10 +3,26 @@
 class LanguageManager:
     def __init__(self):
         self.current_lang = 'English'  
-        self.translations = {
-            'English': {
-                'Welcome_info': 
-                    """Hello, welcome to PDF Editor built entirely in Python!
+        # translations of the languages used so far; each is built the first
+        # time it is needed
+        self.translations = {}
+
+    def set_lang(self, lang_abbr):
+        """Change language dynamically"""
+        if lang_abbr in LANGUAGES:
+            self.current_lang = lang_abbr
+
+    def trans(self, key):
+        lang_dict = self.translations.get(self.current_lang)
+        if lang_dict is None:
+            lang_dict = self.translations[self.current_lang] = LANGUAGES[self.current_lang]()
+        return lang_dict.get(key, key)
+
+
+def _english():
+    return {
+        'Welcome_info': 
+            """Hello, welcome to PDF Editor built entirely in Python!
                     PDF Editor - Quick Guide
                     •Select PDF - Choose input file
                     •Choose Folder - Select output destination
@@ -16,138 +32,218 @@ class LanguageManager:
                     • MERGE: Combine multiple PDFs (no page ranges needed)
                     • EXTRACT/DELETE: Use 1, 3-5, 6 (includes these pages)
                     • SPLIT: Use 5, 9, 12 (splits before these pages)""",
-                # UI
-                'label_title': 'PDF Editor',
-                'label_input_pdfs':'Input PDFs', 
-                'label_output_folder': 'Output Folder', 
-                'label_page_ranges': 'Page Ranges',
-                'label_page_range_example':'for example, 1, 12-15, 17',
-                'label_message_box': 'Info Dashboard',
-                'button_add_pdfs': 'Add PDFs',
-                'button_browse_folder': 'Browse Folder',
-                'merge': 'Merge',
-                'delete': 'Delete',
-                'extract': 'Extract',
-                'split': 'Split',
-                'stop': 'Stop',
-                'title_add_pdfs': 'Select PDF Files',
-                'title_browse_folder': 'Select an Output Folder',
-                # exception handling
-                'error_not_input_paths': 'Missing input PDFs.',
-                'error_not_output_folder': 'Missing output folder.',
-                'error_not_page_ranges': 'Missing page ranges.',
-                # update status
-                'status_with_page_range': """
+        # UI
+        'label_title': 'PDF Editor',
+        'label_input_pdfs':'Input PDFs', 
+        'label_output_folder': 'Output Folder', 
+        'label_page_ranges': 'Page Ranges',
+        'label_page_range_example':'for example, 1, 12-15, 17',
+        'label_message_box': 'Info Dashboard',
+        'button_add_pdfs': 'Add PDFs',
+        'button_browse_folder': 'Browse Folder',
+        'merge': 'Merge',
+        'delete': 'Delete',
+        'extract': 'Extract',
+        'split': 'Split',
+        'stop': 'Stop',
+        'title_add_pdfs': 'Select PDF Files',
+        'title_browse_folder': 'Select an Output Folder',
+        # exception handling
+        'error_not_input_paths': 'Missing input PDFs.',
+        'error_not_output_folder': 'Missing output folder.',
+        'error_not_page_ranges': 'Missing page ranges.',
+        'error_page_out_of_range': 'Page ranges {page_ranges} are beyond the last page ({page_count}).',
+        # update status
+        'status_with_page_range': """
                     PDF operation starts ...
                     Input paths: {input_paths} 
                     Output folder: {output_folder} 
                     Page ranges: {page_ranges}""",
-                'status_no_page_range': 
-                    """PDF operation starts ...
+        'status_no_page_range': 
+            """PDF operation starts ...
                     Input paths: {input_paths} 
                     Output folder: {output_folder}""",
-                'status_stop': 'Stopping operation...',
-                'stop_msg': 'Operation finished!',
-            },
+        'status_stop': 'Stopping operation...',
+        'stop_msg': 'Operation finished!',
+        # progress
+        'progress_running': '{done}/{total} · {rate:.0f} pages/s · ETA {eta:.0f} s',
+        'progress_done': '{pages} pages in {seconds:.1f} s ({rate:.0f} pages/s, {megabytes:.1f} MB)',
+        # jobs
+        'priority_high': 'High priority',
+        'priority_normal': 'Normal priority',
+        'priority_low': 'Low priority',
+        'optimize_off': 'No optimization',
+        'optimize_fast': 'Optimize: fast',
+        'optimize_balanced': 'Optimize: balanced',
+        'optimize_smallest': 'Optimize: smallest',
+        'job_job': '#',
+        'job_operation': 'Operation',
+        'job_files': 'Files',
+        'job_priority': 'Priority',
+        'job_status': 'Status',
+        'job_progress': 'Progress',
+        'job_queued': 'Queued',
+        'job_running': 'Running',
+        'job_done': 'Done',
+        'job_failed': 'Failed',
+        'job_cancelled': 'Cancelled',
+        # page range preview
+        'preview_page_count': '{page_count} pages',
+        'preview_selected_pages': '{selected} of {page_count} pages selected',
+    }
 
-            '中文': {
-                'welcome_info': 
-                (
-                "你好，欢迎使用完全用Python构建的PDF编辑器！\n"
-                "PDF编辑器 - 快速指南\n"
-                "•选择PDF - 选择输入文件\n"
-                "•选择文件夹 - 选择输出目标\n"
-                "•选择功能 - 合并、删除、提取或拆分\n"
-                "就是这样！所选文件夹将自动打开。\n"
-                "PS：\n"
-                "• 合并：合并多个PDF（无需页面范围）\n"
-                "• 提取/删除：使用1、3-5、6（包括这些页面）\n"
-                "• 拆分：使用5、9、12（在这些页面之前拆分）"
-                ),
-                # ui
-                'label_title': "PDF 编辑器",
-                'label_input_pdfs': '输入PDF',
-                'label_output_folder': '输出文件夹',
-                'label_page_ranges': '页面范围',
-                'label_page_range_example':'例如，1、12-15、17',
-                'label_message_box': '信息面板',
-                'button_add_pdfs': '添加PDF',
-                'button_browse_folder': '浏览文件夹',
-                'merge': '合并',
-                'delete': '删除',
-                'extract': '提取',
-                'split': '拆分',
-                'stop': '停止',
-                # exception handling
-                'error_not_input_paths': '缺少输入PDF。',
-                'error_not_output_folder': '缺少输出文件夹。',
-                'error_not_page_ranges': '缺少页面范围。',
-                # update status
-                'status_with_page_range': (
-                    "PDF操作开始...\n"
-                    "输入路径: {input_paths}\n"
-                    "输出文件夹: {output_folder}\n"
-                    "页面范围: {page_ranges}"
-                ),
-                'status_no_page_range': (
-                    "PDF操作开始...\n"
-                    "输入路径: {input_paths}\n"
-                    "输出文件夹: {output_folder}"
-                ),
-                'status_stop': '正在停止操作...',
-                'stop_msg': '操作完成！',
-            },
 
-            'Deutsch': {
-                'welcome_info': (
-                "Hallo, willkommen beim vollständig in Python erstellten PDF-Editor!\n"
-                "PDF-Editor - Schnellübersicht\n"
-                "•PDF auswählen - Eingabedatei wählen\n"
-                "•Ordner wählen - Ausgabeverzeichnis auswählen\n"
-                "•Funktion wählen - Zusammenführen, Löschen, Extrahieren oder Teilen\n"
-                "Das war's! Der gewählte Ordner öffnet sich automatisch.\n"
-                "PS:\n"
-                "• ZUSAMMENFÜGEN: Mehrere PDFs kombinieren (keine Seitenbereiche erforderlich)\n"
-                "• EXTRAHIEREN/LÖSCHEN: Verwenden Sie 1, 3-5, 6 (einschließlich dieser Seiten)\n"
-                "• TEILEN: Verwenden Sie 5, 9, 12 (vor diesen Seiten teilen)"
-                ),
-                'label_title': "PDF Editor",
-                'label_input_pdfs': 'PDFs hinzufügen',
-                'label_output_folder': 'Ordner durchsuchen',
-                'label_page_ranges': 'Seitenbereiche',
-                'button_add_pdfs': 'PDFs hinzufügen',
-                'button_browse_folder': 'Ordner durchsuchen',
-                'merge': 'Zusammenführen',
-                'delete': 'Löschen',
-                'extract': 'Extrahieren',
-                'split': 'Teilen',
-                'stop': 'Stopp',
-                # exception handling
-                'error_not_input_paths': 'Eingabe-PDFs fehlen.',
-                'error_not_output_folder': 'Ausgabeordner fehlt.',
-                'error_not_page_ranges': 'Seitenbereiche fehlen.',
-                # update status
-                'status_with_page_range': (
-                "PDF-Vorgang startet ...\n"
-                "Eingabepfade: {input_paths}\n"
-                "Ausgabeordner: {output_folder}\n"
-                "Seitenbereiche: {page_ranges}"
-                ),
-                'status_no_page_range': (
-                "PDF-Vorgang startet ...\n"
-                "Eingabepfade: {input_paths}\n"
-                "Ausgabeordner: {output_folder}"
-                ),
-                'status_stop': 'Vorgang wird gestoppt...',
-                'stop_msg': 'Vorgang abgeschlossen!',
-            }
-        }
+def _chinese():
+    return {
+        'welcome_info': 
+        (
+        "你好，欢迎使用完全用Python构建的PDF编辑器！\n"
+        "PDF编辑器 - 快速指南\n"
+        "•选择PDF - 选择输入文件\n"
+        "•选择文件夹 - 选择输出目标\n"
+        "•选择功能 - 合并、删除、提取或拆分\n"
+        "就是这样！所选文件夹将自动打开。\n"
+        "PS：\n"
+        "• 合并：合并多个PDF（无需页面范围）\n"
+        "• 提取/删除：使用1、3-5、6（包括这些页面）\n"
+        "• 拆分：使用5、9、12（在这些页面之前拆分）"
+        ),
+        # ui
+        'label_title': "PDF 编辑器",
+        'label_input_pdfs': '输入PDF',
+        'label_output_folder': '输出文件夹',
+        'label_page_ranges': '页面范围',
+        'label_page_range_example':'例如，1、12-15、17',
+        'label_message_box': '信息面板',
+        'button_add_pdfs': '添加PDF',
+        'button_browse_folder': '浏览文件夹',
+        'merge': '合并',
+        'delete': '删除',
+        'extract': '提取',
+        'split': '拆分',
+        'stop': '停止',
+        # exception handling
+        'error_not_input_paths': '缺少输入PDF。',
+        'error_not_output_folder': '缺少输出文件夹。',
+        'error_not_page_ranges': '缺少页面范围。',
+        'error_page_out_of_range': '页面范围 {page_ranges} 超出最后一页（{page_count}）。',
+        # update status
+        'status_with_page_range': (
+            "PDF操作开始...\n"
+            "输入路径: {input_paths}\n"
+            "输出文件夹: {output_folder}\n"
+            "页面范围: {page_ranges}"
+        ),
+        'status_no_page_range': (
+            "PDF操作开始...\n"
+            "输入路径: {input_paths}\n"
+            "输出文件夹: {output_folder}"
+        ),
+        'status_stop': '正在停止操作...',
+        'stop_msg': '操作完成！',
+        # progress
+        'progress_running': '{done}/{total} · {rate:.0f} 页/秒 · 剩余 {eta:.0f} 秒',
+        'progress_done': '{pages} 页，用时 {seconds:.1f} 秒（{rate:.0f} 页/秒，{megabytes:.1f} MB）',
+        # jobs
+        'priority_high': '高优先级',
+        'priority_normal': '普通优先级',
+        'priority_low': '低优先级',
+        'optimize_off': '不优化',
+        'optimize_fast': '优化：快速',
+        'optimize_balanced': '优化：均衡',
+        'optimize_smallest': '优化：最小',
+        'job_job': '#',
+        'job_operation': '操作',
+        'job_files': '文件',
+        'job_priority': '优先级',
+        'job_status': '状态',
+        'job_progress': '进度',
+        'job_queued': '排队中',
+        'job_running': '运行中',
+        'job_done': '完成',
+        'job_failed': '失败',
+        'job_cancelled': '已取消',
+        # page range preview
+        'preview_page_count': '共 {page_count} 页',
+        'preview_selected_pages': '已选择 {selected} / {page_count} 页',
+    }
 
-    def set_lang(self, lang_abbr):
-        """Change language dynamically"""
-        if lang_abbr in self.translations:
-            self.current_lang = lang_abbr
 
-    def trans(self, key):
-        lang_dict = self.translations.get(self.current_lang, {})
-        return lang_dict.get(key, key)
\ No newline at end of file
+def _german():
+    return {
+        'welcome_info': (
+        "Hallo, willkommen beim vollständig in Python erstellten PDF-Editor!\n"
+        "PDF-Editor - Schnellübersicht\n"
+        "•PDF auswählen - Eingabedatei wählen\n"
+        "•Ordner wählen - Ausgabeverzeichnis auswählen\n"
+        "•Funktion wählen - Zusammenführen, Löschen, Extrahieren oder Teilen\n"
+        "Das war's! Der gewählte Ordner öffnet sich automatisch.\n"
+        "PS:\n"
+        "• ZUSAMMENFÜGEN: Mehrere PDFs kombinieren (keine Seitenbereiche erforderlich)\n"
+        "• EXTRAHIEREN/LÖSCHEN: Verwenden Sie 1, 3-5, 6 (einschließlich dieser Seiten)\n"
+        "• TEILEN: Verwenden Sie 5, 9, 12 (vor diesen Seiten teilen)"
+        ),
+        'label_title': "PDF Editor",
+        'label_input_pdfs': 'PDFs hinzufügen',
+        'label_output_folder': 'Ordner durchsuchen',
+        'label_page_ranges': 'Seitenbereiche',
+        'button_add_pdfs': 'PDFs hinzufügen',
+        'button_browse_folder': 'Ordner durchsuchen',
+        'merge': 'Zusammenführen',
+        'delete': 'Löschen',
+        'extract': 'Extrahieren',
+        'split': 'Teilen',
+        'stop': 'Stopp',
+        # exception handling
+        'error_not_input_paths': 'Eingabe-PDFs fehlen.',
+        'error_not_output_folder': 'Ausgabeordner fehlt.',
+        'error_not_page_ranges': 'Seitenbereiche fehlen.',
+        'error_page_out_of_range': 'Seitenbereiche {page_ranges} liegen hinter der letzten Seite ({page_count}).',
+        # update status
+        'status_with_page_range': (
+        "PDF-Vorgang startet ...\n"
+        "Eingabepfade: {input_paths}\n"
+        "Ausgabeordner: {output_folder}\n"
+        "Seitenbereiche: {page_ranges}"
+        ),
+        'status_no_page_range': (
+        "PDF-Vorgang startet ...\n"
+        "Eingabepfade: {input_paths}\n"
+        "Ausgabeordner: {output_folder}"
+        ),
+        'status_stop': 'Vorgang wird gestoppt...',
+        'stop_msg': 'Vorgang abgeschlossen!',
+        # progress
+        'progress_running': '{done}/{total} · {rate:.0f} Seiten/s · noch {eta:.0f} s',
+        'progress_done': '{pages} Seiten in {seconds:.1f} s ({rate:.0f} Seiten/s, {megabytes:.1f} MB)',
+        # jobs
+        'priority_high': 'Hohe Priorität',
+        'priority_normal': 'Normale Priorität',
+        'priority_low': 'Niedrige Priorität',
+        'optimize_off': 'Keine Optimierung',
+        'optimize_fast': 'Optimieren: schnell',
+        'optimize_balanced': 'Optimieren: ausgewogen',
+        'optimize_smallest': 'Optimieren: am kleinsten',
+        'job_job': '#',
+        'job_operation': 'Vorgang',
+        'job_files': 'Dateien',
+        'job_priority': 'Priorität',
+        'job_status': 'Status',
+        'job_progress': 'Fortschritt',
+        'job_queued': 'Wartend',
+        'job_running': 'Läuft',
+        'job_done': 'Fertig',
+        'job_failed': 'Fehlgeschlagen',
+        'job_cancelled': 'Abgebrochen',
+        # page range preview
+        'preview_page_count': '{page_count} Seiten',
+        'preview_selected_pages': '{selected} von {page_count} Seiten ausgewählt',
+    }
+
+
+# language name: function building its translations
+LANGUAGES = {
+    'English': _english,
+    '中文': _chinese,
+    'Deutsch': _german,
+}
@@ -0,0 +1,85 @@
+# bounded, virtualized message log for the info dashboard
+
+import tkinter as tk
+from collections import deque
+from itertools import islice
+
+# entries kept for scrolling back; older ones are dropped
+LOG_LIMIT = 2000
+
+
+class LogView:
+    """Newest-first message log over a capped ring buffer.
+
+    The Text widget only ever holds the entries that fit in it: scrolling
+    moves a window over the buffer and repaints that window, so a repaint
+    costs the same after ten messages as after a day-long batch. Errors are
+    shown in red, everything else in green.
+    """
+
+    def __init__(self, parent, limit=LOG_LIMIT, **text_options):
+        self.frame = tk.Frame(parent)
+        self.text = tk.Text(self.frame, state=tk.DISABLED, **text_options)
+        self.scrollbar = tk.Scrollbar(self.frame, command=self._scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.text.tag_config("error", foreground="red")
+        self.text.tag_config("info", foreground="green")
+        self.entries = deque(maxlen=limit)
+        # index of the first entry shown, 0 being the newest
+        self.first = 0
+        self._dirty = False
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.text.bind(sequence, self._wheel)
+        self.text.bind("<Configure>", lambda event: self.refresh())
+
+    def grid(self, **options):
+        self.frame.grid(**options)
+
+    def append(self, message, is_error=False):
+        """Add an entry; the view is only repainted by refresh()."""
+        self.entries.appendleft((message, is_error))
+        if self.first:
+            # keep the entries the user scrolled to in place
+            self.first = min(self.first + 1, len(self.entries) - 1)
+        self._dirty = True
+
+    def refresh(self, force=True):
+        if not (force or self._dirty):
+            return
+        self._dirty = False
+        rows = self._visible_rows()
+        shown = list(islice(self.entries, self.first, self.first + rows))
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        for message, is_error in shown:
+            self.text.insert(tk.END, message + "\n---\n", "error" if is_error else "info")
+        self.text.config(state=tk.DISABLED)
+        total = len(self.entries) or 1
+        self.scrollbar.set(self.first / total, (self.first + len(shown)) / total)
+
+    def _visible_rows(self):
+        # every entry takes at least one line, so this many always fill the view
+        line_height = self.text.tk.call("font", "metrics", self.text.cget("font"), "-linespace")
+        return max(1, self.text.winfo_height() // max(1, int(line_height)))
+
+    def _move(self, first):
+        first = max(0, min(first, len(self.entries) - self._visible_rows()))
+        if first != self.first:
+            self.first = first
+            self.refresh()
+
+    def _scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self._move(int(float(amount) * len(self.entries)))
+        elif unit == "pages":
+            self._move(self.first + int(amount) * self._visible_rows())
+        else:
+            self._move(self.first + int(amount))
+
+    def _wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self._move(self.first - 3)
+        else:
+            self._move(self.first + 3)
+        return "break"
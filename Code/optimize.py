@@ -0,0 +1,65 @@
+# parallel stream recompression used by the optimize stage
+
+import os, zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# level name: (zlib level, also recompress streams that are already Flate encoded)
+OPTIMIZE_LEVELS = {
+    "fast": (1, False),
+    "balanced": (6, True),
+    "smallest": (9, True),
+}
+# smaller streams are compressed on the calling thread; handing them to the
+# pool costs more than compressing them
+INLINE_BYTES = 64 * 1024
+# compressed streams waiting to be written, per thread
+WINDOW_PER_THREAD = 4
+
+
+class StreamCompressor:
+    """Flate encode stream data on a pool of threads.
+
+    zlib releases the GIL while it compresses, so the threads use separate
+    cores while the writer keeps serializing on its own thread. submit()
+    returns a future of the new encoded data, or of None if the stream is
+    better left as it is: encoding did not make it smaller, or it uses a
+    filter other than Flate (DCT, JBIG2 and CCITT images are never touched).
+    """
+
+    def __init__(self, level="balanced", threads=None):
+        if level not in OPTIMIZE_LEVELS:
+            raise ValueError(f"Unknown optimize level: '{level}'.")
+        self.level, self.recompress = OPTIMIZE_LEVELS[level]
+        self.threads = threads or os.cpu_count() or 1
+        self.window = self.threads * WINDOW_PER_THREAD
+        self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="pdf-compress")
+
+    def submit(self, data, filter_name=None):
+        if len(data) < INLINE_BYTES:
+            future = Future()
+            future.set_result(_compress(data, filter_name, self.level, self.recompress))
+            return future
+        return self._executor.submit(_compress, data, filter_name, self.level, self.recompress)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _compress(data, filter_name, level, recompress):
+    if filter_name is None:
+        encoded = zlib.compress(data, level)
+    elif filter_name == "/FlateDecode" and recompress:
+        try:
+            encoded = zlib.compress(zlib.decompress(data), level)
+        except zlib.error:
+            # PyPDF2 reads some damaged streams that zlib rejects; keep them
+            return None
+    else:
+        return None
+    return encoded if len(encoded) < len(data) else None
@@ -0,0 +1,234 @@
+# page subsets written by copying raw object bytes from the source file
+
+import re
+from bisect import bisect_right
+from io import BytesIO
+from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject
+from fileio import copy_range, map_input
+
+OBJECT_HEADER = re.compile(rb"\s*(\d+)\s+(\d+)\s+obj")
+REFERENCE = re.compile(rb"(\d+)\s+(\d+)\s+R(?![A-Za-z0-9])")
+STREAM_START = re.compile(rb">>\s*stream(?:\r\n|\n|\r)")
+STREAM_LENGTH = re.compile(rb"/Length(?![A-Za-z0-9])\s*(\d+)(?:\s+(\d+)\s+R(?![A-Za-z0-9]))?")
+STREAM_END = re.compile(rb"\s*endstream\s*endobj")
+PAGE_TYPE = re.compile(rb"/Type\s*/Pages?(?![A-Za-z0-9])")
+# small objects are cheaper to copy through the write buffer than with a syscall
+SENDFILE_THRESHOLD = 64 * 1024
+
+RAW, ENCODED, NULL, MISSING = range(4)
+
+
+class PageSubsetWriter:
+    """Write page subsets of one source document without re-serializing it.
+
+    Objects reachable from the pages keep their original numbers, so their
+    bytes can be copied from the source file unchanged (os.sendfile where
+    possible) and only their dictionaries are scanned for references. Only
+    the page dictionaries, a new page tree, the xref table and the trailer
+    are serialized. Objects stored inside object streams are serialized on
+    their own. References to pages that are not kept, or to the old page tree,
+    are written as null objects.
+
+    The object graph and the encoded bytes of serialized objects are kept on
+    the writer, so writing many subsets of one source (the parts of a split)
+    scans and serializes each shared font, image or profile only once.
+    Encrypted documents cannot be copied byte for byte; write() returns False
+    for them without writing anything.
+    """
+
+    def __init__(self, reader, input_path):
+        self.reader = reader
+        self.input_path = input_path
+        self.mapped = None if reader.is_encrypted else map_input(input_path)
+        self._source = None
+        self._nodes = {}
+        if self.mapped is None:
+            return
+        self._source = open(input_path, "rb")
+        # an id a newer update moved into an object stream also keeps the
+        # offset of its older version; like PyPDF2, the object stream wins
+        self._raw_offsets = {}
+        for generation, entries in reader.xref.items():
+            free = reader.xref_free_entry.get(generation, {})
+            for idnum, offset in entries.items():
+                if offset and not free.get(idnum, False) and not (generation == 0 and idnum in reader.xref_objStm):
+                    self._raw_offsets[(idnum, generation)] = offset
+        self._boundaries = sorted(set(self._raw_offsets.values()))
+        size = int(reader.trailer.get("/Size", 0))
+        for idnum, _ in self._raw_offsets:
+            size = max(size, idnum + 1)
+        for idnum in reader.xref_objStm:
+            size = max(size, idnum + 1)
+        self.pages_id, self.catalog_id = size, size + 1
+        self.header = reader.pdf_header.encode("latin-1") + b"\n%\xe2\xe3\xcf\xd3\n"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.mapped is not None:
+            self.mapped.close()
+            self.mapped = None
+        if self._source is not None:
+            self._source.close()
+            self._source = None
+
+    def write(self, pages, output_file):
+        """Write the given 0-indexed pages to output_file. Returns False if unsupported."""
+        if self.mapped is None:
+            return False
+        page_objects = [self.reader.pages[page] for page in pages]
+        if any(page.indirect_reference is None for page in page_objects):
+            return False
+
+        kept_pages = {(page.indirect_reference.idnum, page.indirect_reference.generation): page for page in page_objects}
+        seen = set(kept_pages)
+        stack = []
+        for page in page_objects:
+            _collect_refs(page, stack, skip_parent=True)
+        raw, other = [], []
+        while stack:
+            key = stack.pop()
+            if key in seen:
+                continue
+            seen.add(key)
+            kind, children, payload = self._node(key)
+            if kind == MISSING:
+                continue
+            stack.extend(children)
+            if kind == RAW:
+                raw.append((payload[0], key))
+            else:
+                other.append(key)
+        raw.sort()
+
+        mapped = self.mapped
+        xref = {}
+        output_file.write(self.header)
+        for start, key in raw:
+            end = self._nodes[key][2][1]
+            xref[key] = output_file.tell()
+            if end - start < SENDFILE_THRESHOLD:
+                output_file.write(mapped[start:end])
+            else:
+                copy_range(self._source, output_file, start, end - start)
+            output_file.write(b"\n")
+        for key in other:
+            kind, _, payload = self._nodes[key]
+            xref[key] = output_file.tell()
+            output_file.write(f"{key[0]} {key[1]} obj\n".encode())
+            output_file.write(payload if kind == ENCODED else b"null")
+            output_file.write(b"\nendobj\n")
+        for key, page in kept_pages.items():
+            xref[key] = output_file.tell()
+            output_file.write(f"{key[0]} {key[1]} obj\n<<\n".encode())
+            for name, value in page.items():
+                if name == "/Parent":
+                    continue
+                name.write_to_stream(output_file, None)
+                output_file.write(b" ")
+                value.write_to_stream(output_file, None)
+                output_file.write(b"\n")
+            output_file.write(f"/Parent {self.pages_id} 0 R\n>>\nendobj\n".encode())
+        kids = " ".join(f"{page.indirect_reference.idnum} {page.indirect_reference.generation} R" for page in page_objects)
+        xref[(self.pages_id, 0)] = output_file.tell()
+        output_file.write(f"{self.pages_id} 0 obj\n<<\n/Type /Pages\n/Count {len(page_objects)}\n/Kids [{kids}]\n>>\nendobj\n".encode())
+        xref[(self.catalog_id, 0)] = output_file.tell()
+        output_file.write(f"{self.catalog_id} 0 obj\n<<\n/Type /Catalog\n/Pages {self.pages_id} 0 R\n>>\nendobj\n".encode())
+        _write_xref(output_file, xref, self.catalog_id + 1, self.catalog_id)
+        return True
+
+    def _node(self, key):
+        """(kind, referenced keys, payload) of an object, computed once per writer."""
+        node = self._nodes.get(key)
+        if node is None:
+            node = self._raw_node(key) or self._parsed_node(key)
+            self._nodes[key] = node
+        return node
+
+    def _raw_node(self, key):
+        # objects stored as-is in the file: scan the dictionary text for
+        # references instead of parsing, so stream data is never read. The
+        # object ends at its own endobj, after /Length bytes for a stream;
+        # anything up to the next live object may be dead older versions
+        # left by incremental updates
+        start = self._raw_offsets.get(key)
+        if start is None:
+            return None
+        mapped = self.mapped
+        next_index = bisect_right(self._boundaries, start)
+        limit = self._boundaries[next_index] if next_index < len(self._boundaries) else len(mapped)
+        header = OBJECT_HEADER.match(mapped, start)
+        if header is None or (int(header.group(1)), int(header.group(2))) != key:
+            return None
+        end = mapped.find(b"endobj", header.end(), limit)
+        if end < 0:
+            return None
+        # stream data may contain "endobj", but not before the stream keyword
+        stream_start = STREAM_START.search(mapped, header.end(), end)
+        head = mapped[header.end():stream_start.start() + 2 if stream_start else end]
+        if stream_start:
+            length = self._stream_length(head)
+            stream_end = STREAM_END.match(mapped, stream_start.end() + length) if length is not None else None
+            if stream_end is None:
+                return None
+            end = stream_end.end() - len(b"endobj")
+        if PAGE_TYPE.search(head):
+            return NULL, (), None
+        children = tuple((int(idnum), int(generation)) for idnum, generation in REFERENCE.findall(head))
+        return RAW, children, (start, end + len(b"endobj"))
+
+    def _stream_length(self, head):
+        length = STREAM_LENGTH.search(head)
+        if length is None:
+            return None
+        if length.group(2) is None:
+            return int(length.group(1))
+        value = IndirectObject(int(length.group(1)), int(length.group(2)), self.reader).get_object()
+        return value if isinstance(value, int) else None
+
+    def _parsed_node(self, key):
+        obj = IndirectObject(key[0], key[1], self.reader).get_object()
+        if obj is None:
+            return MISSING, (), None
+        if isinstance(obj, DictionaryObject) and obj.get("/Type") in ("/Page", "/Pages"):
+            return NULL, (), None
+        children = []
+        _collect_refs(obj, children)
+        encoded = BytesIO()
+        obj.write_to_stream(encoded, None)
+        return ENCODED, tuple(children), encoded.getvalue()
+
+
+def _collect_refs(obj, stack, skip_parent=False):
+    if isinstance(obj, IndirectObject):
+        stack.append((obj.idnum, obj.generation))
+    elif isinstance(obj, DictionaryObject):
+        for name, value in obj.items():
+            if skip_parent and name == "/Parent":
+                continue
+            _collect_refs(value, stack)
+    elif isinstance(obj, ArrayObject):
+        for item in obj:
+            _collect_refs(item, stack)
+
+
+def _write_xref(output_file, xref, size, catalog_id):
+    # one subsection per run of consecutive object numbers keeps the table
+    # small when only a few objects of a large document are kept
+    xref_offset = output_file.tell()
+    entries = sorted((idnum, generation, offset) for (idnum, generation), offset in xref.items())
+    output_file.write(b"xref\n0 1\n0000000000 65535 f \n")
+    run_start = 0
+    for index in range(1, len(entries) + 1):
+        if index == len(entries) or entries[index][0] != entries[index - 1][0] + 1:
+            run = entries[run_start:index]
+            output_file.write(f"{run[0][0]} {len(run)}\n".encode())
+            for _, generation, offset in run:
+                output_file.write(f"{offset:010d} {generation:05d} n \n".encode())
+            run_start = index
+    output_file.write(f"trailer\n<<\n/Size {size}\n/Root {catalog_id} 0 R\n>>\n".encode())
+    output_file.write(f"startxref\n{xref_offset}\n%%EOF\n".encode())
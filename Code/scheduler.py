@@ -0,0 +1,165 @@
+# job scheduler running backend operations concurrently for the gui
+
+import heapq, itertools, os, threading
+from collections import namedtuple
+from events import OperationEvent
+
+# concurrent jobs by default; parsing holds the GIL, so more threads than
+# this mostly add contention, while writes, fsync and split workers overlap
+MAX_WORKERS = 4
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+# posted on the scheduler's message queue: item is what the backend posted
+# for the job ((message, is_error) or an OperationEvent), or None when the
+# job's status changed
+JobUpdate = namedtuple("JobUpdate", "job item")
+
+
+def default_workers():
+    return max(1, min(MAX_WORKERS, os.cpu_count() or 1))
+
+
+class Job:
+    """One queued backend operation with its own cancellation token."""
+
+    def __init__(self, job_id, operation, target, args, priority, input_paths):
+        self.id = job_id
+        self.operation = operation
+        self.target = target
+        self.args = args
+        self.priority = priority
+        self.input_paths = [os.path.abspath(path) for path in input_paths]
+        self.stop_event = threading.Event()
+        self.status = QUEUED
+        self.errors = []
+        # latest start, progress or end event of the operation
+        self.last_event = None
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+
+class _JobQueue:
+    # stands in for the backend's message_queue and tags every item with its job
+    def __init__(self, job, message_queue):
+        self.job = job
+        self.message_queue = message_queue
+
+    def put(self, item):
+        if isinstance(item, OperationEvent):
+            if item.kind != "phase":
+                self.job.last_event = item
+        elif item[1]:
+            self.job.errors.append(item[0])
+        self.message_queue.put(JobUpdate(self.job, item))
+
+
+class JobScheduler:
+    """Run backend operations on a bounded pool of worker threads.
+
+    Jobs wait in a priority queue (higher priority first, then submission
+    order) and each gets its own stop event, so cancelling one job leaves the
+    others running. Jobs that read the same input file never run at the same
+    time, because the parsed documents in the backend's cache are shared and
+    PdfReader is not thread safe; a later job on another file may start first.
+    """
+
+    def __init__(self, message_queue, workers=None):
+        self.message_queue = message_queue
+        self.workers = workers or default_workers()
+        # unfinished jobs by id
+        self.jobs = {}
+        self._pending = []
+        self._busy_inputs = set()
+        self._threads = []
+        self._ids = itertools.count(1)
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def submit(self, operation, target, args, input_paths, priority=0):
+        """Queue target(*args, message_queue, stop_event) and return its Job."""
+        with self._condition:
+            job = Job(next(self._ids), operation, target, args, priority, input_paths)
+            self.jobs[job.id] = job
+            heapq.heappush(self._pending, (-priority, job.id, job))
+            if len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._condition.notify()
+        self.message_queue.put(JobUpdate(job, None))
+        return job
+
+    def cancel(self, job):
+        with self._condition:
+            if job.finished:
+                return
+            job.stop_event.set()
+            if job.status != QUEUED:
+                # a running job stops at its next check of the stop event
+                return
+            # left in the heap, the workers skip it
+            job.status = CANCELLED
+            del self.jobs[job.id]
+        self.message_queue.put(JobUpdate(job, None))
+
+    def cancel_all(self):
+        for job in self.active():
+            self.cancel(job)
+
+    def active(self):
+        with self._condition:
+            return list(self.jobs.values())
+
+    def shutdown(self):
+        self.cancel_all()
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def _next_job(self):
+        # called with the condition held: the highest priority job whose
+        # inputs are not in use, or None
+        skipped = []
+        job = None
+        while self._pending:
+            entry = heapq.heappop(self._pending)
+            candidate = entry[2]
+            if candidate.status == CANCELLED:
+                continue
+            if self._busy_inputs.isdisjoint(candidate.input_paths):
+                job = candidate
+                break
+            skipped.append(entry)
+        for entry in skipped:
+            heapq.heappush(self._pending, entry)
+        return job
+
+    def _work(self):
+        while True:
+            with self._condition:
+                job = self._next_job()
+                while job is None and not self._closed:
+                    self._condition.wait()
+                    job = self._next_job()
+                if job is None:
+                    return
+                job.status = RUNNING
+                self._busy_inputs.update(job.input_paths)
+            self.message_queue.put(JobUpdate(job, None))
+            try:
+                job.target(*job.args, _JobQueue(job, self.message_queue), job.stop_event)
+            except Exception as e:
+                job.errors.append(str(e))
+            with self._condition:
+                self._busy_inputs.difference_update(job.input_paths)
+                # a job stopped just after it finished still counts as done
+                if not job.errors:
+                    job.status = DONE
+                else:
+                    job.status = CANCELLED if job.stop_event.is_set() else FAILED
+                del self.jobs[job.id]
+                self._condition.notify_all()
+            self.message_queue.put(JobUpdate(job, None))
@@ -0,0 +1,121 @@
+# page selection parsing and lookup
+
+from bisect import bisect_right
+
+
+def parse_page_ranges(pages_list, message_queue):
+    """Parse page range strings into (start, end, step) specs.
+
+    Supported forms (1-indexed): "7", "3-5", "10-" (to the last page),
+    "-5" (the last five pages) and a ":step" suffix such as "1-100:2".
+    start/end are None when open-ended; a negative start counts from the end.
+    """
+    if not pages_list:
+        message_queue.put(("pages_list must be a non-empty list of page numbers or ranges.", True))
+        return []
+    specs = []
+    for item in pages_list:
+        item = item.strip()
+        body, _, step_text = item.partition(':')
+        try:
+            step = int(step_text) if step_text else 1
+        except ValueError:
+            message_queue.put((f"Invalid page step: '{item}'. The step after ':' must be an integer.", True))
+            continue
+        if step < 1:
+            message_queue.put((f"Invalid page step: '{item}'. The step must be at least 1.", True))
+            continue
+        if '-' in body:
+            try:
+                start_text, end_text = body.split('-')
+                if not start_text:
+                    count = int(end_text)
+                    if count < 1:
+                        raise ValueError
+                    specs.append((-count, None, step))
+                    continue
+                start = int(start_text)
+                end = int(end_text) if end_text else None
+            except ValueError:
+                message_queue.put((f"Invalid page range format: '{item}'. Please use numbers separated by a hyphen(-).", True))
+                continue
+            if end is not None and start > end:
+                message_queue.put((f"Invalid page range: {item}. Start page must not be greater than end page.", True))
+            else:
+                specs.append((start, end, step))
+        else:
+            try:
+                page = int(body)
+            except ValueError:
+                message_queue.put((f"Invalid page number: '{item}'. Please use integers only.", True))
+                continue
+            if step_text:
+                message_queue.put((f"Invalid page range format: '{item}'. A step needs a page range.", True))
+            else:
+                specs.append((page, page, 1))
+    return specs
+
+
+def out_of_range(specs, page_count):
+    """Return the page range strings of specs that reach past the last page."""
+    beyond = []
+    for start, end, step in specs:
+        if (start is not None and start > page_count) or (end is not None and end > page_count):
+            text = str(start) if start == end else f"{start}-{end if end is not None else ''}"
+            beyond.append(text + (f":{step}" if step > 1 else ""))
+    return beyond
+
+
+class PageSelection:
+    """Selected pages of one document as merged, 0-indexed half-open intervals.
+
+    Built once per operation; membership is a binary search over the interval
+    starts and iteration walks the intervals, so no operation has to scan the
+    whole document to find its pages. Pages outside the document are dropped.
+    """
+
+    def __init__(self, specs, page_count):
+        self.page_count = page_count
+        intervals = []
+        for start, end, step in specs:
+            if start is not None and start < 0:
+                start = max(page_count + start + 1, 1)
+            end = page_count if end is None else min(end, page_count)
+            start = max(start, 1)
+            if start > end:
+                continue
+            if step == 1:
+                intervals.append((start - 1, end))
+            else:
+                intervals.extend((page - 1, page) for page in range(start, end + 1, step))
+        intervals.sort()
+        self.intervals = []
+        for start, stop in intervals:
+            if self.intervals and start <= self.intervals[-1][1]:
+                if stop > self.intervals[-1][1]:
+                    self.intervals[-1] = (self.intervals[-1][0], stop)
+            else:
+                self.intervals.append((start, stop))
+        self._starts = [start for start, _ in self.intervals]
+
+    def __contains__(self, index):
+        position = bisect_right(self._starts, index) - 1
+        return position >= 0 and index < self.intervals[position][1]
+
+    def __iter__(self):
+        for start, stop in self.intervals:
+            yield from range(start, stop)
+
+    def __len__(self):
+        return sum(stop - start for start, stop in self.intervals)
+
+    def __bool__(self):
+        return bool(self.intervals)
+
+    def complement(self):
+        """Yield the 0-indexed pages that are not selected, in order."""
+        previous = 0
+        for start, stop in self.intervals:
+            yield from range(previous, start)
+            previous = stop
+        yield from range(previous, self.page_count)
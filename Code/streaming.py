@@ -0,0 +1,374 @@
+# incremental pdf writer used by the streaming merge
+
+import time, zlib
+from collections import deque
+from hashlib import blake2b
+from io import BytesIO
+from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
+
+PAGES_ID = 1
+CATALOG_ID = 2
+# digest of the null object written for references to pages that are not copied
+NULL_DIGEST = b"null"
+# objects packed into one object stream when compressing
+OBJECTS_PER_STREAM = 200
+
+
+class StreamingPdfWriter:
+    """Write pages to the output file as soon as they are added.
+
+    PyPDF2's PdfWriter keeps every object in memory until write(). This writer
+    copies each page and the objects it references straight to the output,
+    renumbering references on the fly, and only remembers object offsets and
+    page ids. Once add_reader() returns the source reader can be released, so
+    memory is bounded by the largest input instead of the sum of all inputs.
+    Outlines and named destinations of the inputs are not carried over.
+
+    With dedup, every object the pages reach is content hashed before it is
+    written, children first, so the digest of a font or image dictionary
+    covers the objects it references. Objects whose digest was already
+    written, from this input or an earlier one, are referenced instead of
+    copied again; only the digests are kept between inputs. duplicates,
+    bytes_saved and hash_seconds report what that saved and cost.
+
+    With a compressor (optimize.StreamCompressor), streams are Flate encoded
+    on its threads while the pages are serialized, objects that are not
+    streams are packed into compressed object streams and the xref table is
+    written as a compressed xref stream. Encoded streams are written in the
+    order they were queued, at most compressor.window of them held back.
+    """
+
+    def __init__(self, stream, dedup=False, compressor=None):
+        self.stream = stream
+        self.offsets = {}
+        self.page_ids = []
+        self.next_id = CATALOG_ID + 1
+        self.dedup = dedup
+        self.duplicates = 0
+        self.bytes_saved = 0
+        self.hash_seconds = 0.0
+        self._written = {}
+        self._cycles = 0
+        self.compressor = compressor
+        # object id -> (object stream id, index) of packed objects
+        self.packed = {}
+        self._pack_ids = []
+        self._pack_bodies = []
+        self._queued = deque()
+        self.stream.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+    def add_reader(self, reader, pages=None, stop_event=None):
+        """Copy pages of reader (all, or the given 0-indexed pages). Returns False if cancelled."""
+        source_pages = reader.pages
+        if pages is None:
+            pages = range(len(source_pages))
+        self._id_map = {}
+        self._pending = []
+        page_refs = []
+        for page in pages:
+            ref = source_pages[page].indirect_reference
+            new_id = self._allocate()
+            if ref is not None:
+                self._id_map[(ref.idnum, ref.generation)] = new_id
+            page_refs.append(new_id)
+        if self.dedup:
+            start = time.perf_counter()
+            self._plan(source_pages, pages, page_refs)
+            self.hash_seconds += time.perf_counter() - start
+        for page, new_id in zip(pages, page_refs):
+            if stop_event is not None and stop_event.is_set():
+                return False
+            self._write_indirect(new_id, source_pages[page], is_page=True)
+            self.page_ids.append(new_id)
+            self._flush_pending()
+        self._id_map = self._pending = None
+        return True
+
+    def close(self):
+        """Write the page tree, catalog, xref table and trailer."""
+        kids = " ".join(f"{page_id} 0 R" for page_id in self.page_ids)
+        self._write_raw(PAGES_ID, f"<<\n/Type /Pages\n/Count {len(self.page_ids)}\n/Kids [{kids}]\n>>".encode())
+        self._write_raw(CATALOG_ID, f"<<\n/Type /Catalog\n/Pages {PAGES_ID} 0 R\n>>".encode())
+        if self.compressor is not None:
+            self._flush_pack()
+            while self._queued:
+                self._write_queued()
+            self._write_xref_stream()
+            return
+        xref_offset = self.stream.tell()
+        size = self.next_id
+        self.stream.write(f"xref\n0 {size}\n0000000000 65535 f \n".encode())
+        for object_id in range(1, size):
+            self.stream.write(f"{self.offsets.get(object_id, 0):010d} 00000 n \n".encode())
+        self.stream.write(f"trailer\n<<\n/Size {size}\n/Root {CATALOG_ID} 0 R\n>>\n".encode())
+        self.stream.write(f"startxref\n{xref_offset}\n%%EOF\n".encode())
+
+    def _allocate(self):
+        new_id = self.next_id
+        self.next_id += 1
+        return new_id
+
+    def _ref(self, indirect):
+        key = (indirect.idnum, indirect.generation)
+        if key not in self._id_map:
+            self._id_map[key] = self._allocate()
+            self._pending.append(indirect)
+        return self._id_map[key]
+
+    def _flush_pending(self):
+        while self._pending:
+            indirect = self._pending.pop()
+            new_id = self._id_map[(indirect.idnum, indirect.generation)]
+            obj = indirect.get_object()
+            # references to pages that are not copied (or to the source page
+            # tree) would drag the whole source document along
+            if _is_page(obj):
+                self._write_raw(new_id, b"null")
+            else:
+                self._write_indirect(new_id, obj)
+
+    def _plan(self, source_pages, pages, page_refs):
+        # gives every object reachable from the pages its output id up front:
+        # the id of an identical object already written, or a new one
+        digests = {}
+        for page, new_id in zip(pages, page_refs):
+            ref = source_pages[page].indirect_reference
+            if ref is not None:
+                # references to copied pages stay distinct per page
+                digests[(ref.idnum, ref.generation)] = b"page %d" % new_id
+        for page in pages:
+            for child in _references(source_pages[page], is_page=True):
+                self._digest(child, digests)
+
+    def _digest(self, root, digests):
+        # iterative post-order walk; an object on the current path that is
+        # referenced again (a cycle) gets a unique digest and is never shared
+        on_path = set()
+        stack = [(root, False)]
+        while stack:
+            indirect, expanded = stack.pop()
+            key = (indirect.idnum, indirect.generation)
+            if key in digests or (not expanded and key in on_path):
+                continue
+            obj = indirect.get_object()
+            if not expanded:
+                on_path.add(key)
+                stack.append((indirect, True))
+                if not _is_page(obj):
+                    stack.extend((child, False) for child in _references(obj))
+                continue
+            on_path.discard(key)
+            if _is_page(obj):
+                digest, size = NULL_DIGEST, 0
+            else:
+                sink = _HashSink()
+                self._canonical(obj, digests, sink)
+                digest, size = sink.digest(), sink.size
+            digests[key] = digest
+            existing = self._written.get(digest)
+            if existing is not None:
+                self._id_map[key] = existing
+                if digest != NULL_DIGEST:
+                    self.duplicates += 1
+                    self.bytes_saved += size
+            else:
+                self._id_map[key] = self._written[digest] = self._allocate()
+                self._pending.append(indirect)
+
+    def _canonical(self, obj, digests, sink):
+        # the bytes _serialize writes, with references replaced by the
+        # digests of their targets
+        if isinstance(obj, IndirectObject):
+            digest = digests.get((obj.idnum, obj.generation))
+            if digest is None:
+                self._cycles += 1
+                digest = b"cycle %d" % self._cycles
+            sink.write(b"@" + digest)
+        elif isinstance(obj, DictionaryObject):
+            sink.write(b"<<")
+            for key, value in obj.items():
+                if key == "/Length" and isinstance(obj, StreamObject):
+                    continue
+                key.write_to_stream(sink, None)
+                sink.write(b" ")
+                self._canonical(value, digests, sink)
+            sink.write(b">>")
+            if isinstance(obj, StreamObject):
+                sink.write(b"stream %d\n" % len(obj._data))
+                sink.write(obj._data)
+        elif isinstance(obj, ArrayObject):
+            sink.write(b"[")
+            for item in obj:
+                sink.write(b" ")
+                self._canonical(item, digests, sink)
+            sink.write(b"]")
+        else:
+            obj.write_to_stream(sink, None)
+
+    def _write_raw(self, object_id, body):
+        if self.compressor is not None:
+            self._pack(object_id, body)
+            return
+        self.offsets[object_id] = self.stream.tell()
+        self.stream.write(f"{object_id} 0 obj\n".encode())
+        self.stream.write(body)
+        self.stream.write(b"\nendobj\n")
+
+    def _write_indirect(self, object_id, obj, is_page=False):
+        if self.compressor is not None:
+            if isinstance(obj, StreamObject):
+                self._queue_stream(object_id, obj)
+            else:
+                body = BytesIO()
+                self._serialize(obj, body, is_page)
+                self._pack(object_id, body.getvalue())
+            return
+        self.offsets[object_id] = self.stream.tell()
+        self.stream.write(f"{object_id} 0 obj\n".encode())
+        self._serialize(obj, self.stream, is_page)
+        self.stream.write(b"\nendobj\n")
+
+    def _serialize(self, obj, out, is_page=False):
+        if isinstance(obj, IndirectObject):
+            out.write(f"{self._ref(obj)} 0 R".encode())
+        elif isinstance(obj, DictionaryObject):
+            out.write(b"<<\n")
+            self._serialize_entries(obj, out, is_page)
+            if isinstance(obj, StreamObject):
+                out.write(f"/Length {len(obj._data)}\n".encode())
+            out.write(b">>")
+            if isinstance(obj, StreamObject):
+                out.write(b"\nstream\n")
+                out.write(obj._data)
+                out.write(b"\nendstream")
+        elif isinstance(obj, ArrayObject):
+            out.write(b"[")
+            for item in obj:
+                out.write(b" ")
+                self._serialize(item, out)
+            out.write(b" ]")
+        else:
+            obj.write_to_stream(out, None)
+
+    def _serialize_entries(self, obj, out, is_page=False, stream_keys=("/Length",)):
+        # stream_keys are left out of stream dictionaries
+        for key, value in obj.items():
+            if key == "/Parent" and is_page:
+                continue
+            if key in stream_keys and isinstance(obj, StreamObject):
+                continue
+            key.write_to_stream(out, None)
+            out.write(b" ")
+            self._serialize(value, out)
+            out.write(b"\n")
+        if is_page:
+            out.write(f"/Parent {PAGES_ID} 0 R\n".encode())
+
+    def _queue_stream(self, object_id, obj):
+        entries = BytesIO()
+        self._serialize_entries(obj, entries, stream_keys=("/Length", "/Filter"))
+        filter_entry = BytesIO()
+        stream_filter = obj.get("/Filter")
+        if stream_filter is not None:
+            filter_entry.write(b"/Filter ")
+            self._serialize(stream_filter, filter_entry)
+            filter_entry.write(b"\n")
+            stream_filter = stream_filter.get_object()
+        self._queue(object_id, entries.getvalue(), filter_entry.getvalue(), obj._data,
+                    self.compressor.submit(obj._data, stream_filter))
+
+    def _queue(self, object_id, entries, filter_entry, data, future):
+        self._queued.append((object_id, entries, filter_entry, data, future))
+        while self._queued and (len(self._queued) > self.compressor.window or self._queued[0][4].done()):
+            self._write_queued()
+
+    def _write_queued(self):
+        object_id, entries, filter_entry, data, future = self._queued.popleft()
+        encoded = future.result()
+        if encoded is not None:
+            filter_entry, data = b"/Filter /FlateDecode\n", encoded
+        self.offsets[object_id] = self.stream.tell()
+        self.stream.write(b"%d 0 obj\n<<\n%s%s/Length %d\n>>\nstream\n" % (object_id, entries, filter_entry, len(data)))
+        self.stream.write(data)
+        self.stream.write(b"\nendstream\nendobj\n")
+
+    def _pack(self, object_id, body):
+        self._pack_ids.append(object_id)
+        self._pack_bodies.append(body)
+        if len(self._pack_ids) >= OBJECTS_PER_STREAM:
+            self._flush_pack()
+
+    def _flush_pack(self):
+        # object stream: "id offset" pairs, then the objects, offsets
+        # counted from /First
+        if not self._pack_ids:
+            return
+        stream_id = self._allocate()
+        index, offset = [], 0
+        for position, (object_id, body) in enumerate(zip(self._pack_ids, self._pack_bodies)):
+            index.append(b"%d %d" % (object_id, offset))
+            offset += len(body) + 1
+            self.packed[object_id] = (stream_id, position)
+        head = b" ".join(index) + b"\n"
+        data = head + b"\n".join(self._pack_bodies)
+        entries = b"/Type /ObjStm\n/N %d\n/First %d\n" % (len(self._pack_ids), len(head))
+        self._pack_ids, self._pack_bodies = [], []
+        self._queue(stream_id, entries, b"", data, self.compressor.submit(data))
+
+    def _write_xref_stream(self):
+        # rows of [type, offset or object stream id, index], the widest
+        # field sized to the file
+        xref_id = self._allocate()
+        size = self.next_id
+        xref_offset = self.offsets[xref_id] = self.stream.tell()
+        width = max(1, (max(xref_offset, size).bit_length() + 7) // 8)
+        rows = bytearray()
+        for object_id in range(size):
+            if object_id in self.offsets:
+                rows += b"\x01" + self.offsets[object_id].to_bytes(width, "big") + b"\x00\x00"
+            elif object_id in self.packed:
+                stream_id, position = self.packed[object_id]
+                rows += b"\x02" + stream_id.to_bytes(width, "big") + position.to_bytes(2, "big")
+            else:
+                rows += b"\x00" + bytes(width) + b"\xff\xff"
+        data = zlib.compress(bytes(rows))
+        self.stream.write((f"{xref_id} 0 obj\n<<\n/Type /XRef\n/Size {size}\n/W [1 {width} 2]\n/Root {CATALOG_ID} 0 R\n"
+                           f"/Filter /FlateDecode\n/Length {len(data)}\n>>\nstream\n").encode())
+        self.stream.write(data)
+        self.stream.write(f"\nendstream\nendobj\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+
+
+class _HashSink:
+    # write() target that hashes and counts instead of storing the bytes
+    def __init__(self):
+        self._hash = blake2b(digest_size=20)
+        self.size = 0
+
+    def write(self, data):
+        self._hash.update(data)
+        self.size += len(data)
+
+    def digest(self):
+        return self._hash.digest()
+
+
+def _is_page(obj):
+    return isinstance(obj, DictionaryObject) and obj.get("/Type") in ("/Page", "/Pages")
+
+
+def _references(obj, is_page=False):
+    """Indirect references in obj that _serialize follows."""
+    found = []
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, IndirectObject):
+            found.append(item)
+        elif isinstance(item, DictionaryObject):
+            for key, value in item.items():
+                if (key == "/Parent" and is_page and item is obj) or (key == "/Length" and isinstance(item, StreamObject)):
+                    continue
+                stack.append(value)
+        elif isinstance(item, ArrayObject):
+            stack.extend(item)
+    return found
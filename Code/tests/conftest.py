@@ -0,0 +1,5 @@
+# the modules live flat in the Code folder and import each other by name
+
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
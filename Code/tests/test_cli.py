@@ -0,0 +1,27 @@
+# manifest runs
+
+import json
+import pytest
+from cli import load_manifest, run_jobs
+from corpus import write_synthetic_pdf
+
+
+@pytest.mark.parametrize("concurrency", [1, 2])
+def test_failing_jobs_do_not_stop_the_run(tmp_path, concurrency):
+    with open(tmp_path / "a.pdf", "wb") as output:
+        write_synthetic_pdf(output, 3)
+    (tmp_path / "afile").write_bytes(b"")
+    jobs = [
+        {"name": "bad output", "operation": "extract", "inputs": ["a.pdf"], "output": "afile/sub", "pages": "1"},
+        {"name": "string inputs", "operation": "extract", "inputs": "a.pdf", "output": "out", "pages": "1"},
+        {"name": "good", "operation": "extract", "inputs": ["a.pdf"], "output": "out", "pages": "2"},
+    ]
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps(jobs))
+
+    results = {result["name"]: result for result in run_jobs(load_manifest(str(manifest))["jobs"], concurrency)}
+    assert {name: result["ok"] for name, result in results.items()} == {"bad output": False, "string inputs": False, "good": True}
+    assert results["bad output"]["messages"][0].startswith("An error occurred:")
+    assert results["string inputs"]["messages"] == ["The inputs must be a list of PDF files."]
+    assert results["good"]["pages"] == 1
+    assert len(list((tmp_path / "out").iterdir())) == 1
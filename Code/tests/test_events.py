@@ -0,0 +1,36 @@
+# progress events
+
+import queue, threading
+import pytest
+import events
+from corpus import write_synthetic_pdf
+from editor import PDFEditorBackend
+from events import OperationEvent
+
+
+@pytest.mark.parametrize("operation, args, options", [
+    ("extract_pages", (["1-"],), {}),
+    ("merge_pdfs", (), {"streaming": True}),
+])
+def test_progress_reports_bytes_while_writing(tmp_path, monkeypatch, operation, args, options):
+    monkeypatch.setattr(events, "PROGRESS_INTERVAL", 0.0)
+    input_paths = []
+    for seed in range(2):
+        input_paths.append(str(tmp_path / f"in{seed}.pdf"))
+        with open(input_paths[-1], "wb") as output:
+            write_synthetic_pdf(output, 4, image_bytes=256 * 1024, seed=seed)
+    output_folder = tmp_path / "out"
+    output_folder.mkdir()
+    message_queue = queue.Queue()
+    backend = PDFEditorBackend(open_folder=False, cache_bytes=0)
+    inputs = input_paths if operation == "merge_pdfs" else input_paths[:1]
+    getattr(backend, operation)(inputs, str(output_folder), *args, message_queue, threading.Event(), **options)
+
+    items = [item for item in message_queue.queue if isinstance(item, OperationEvent)]
+    written = [item.data["bytes_written"] for item in items if item.kind == "progress"]
+    end, = [item for item in items if item.kind == "end"]
+    output, = output_folder.iterdir()
+    assert end.data["bytes_written"] == output.stat().st_size
+    # the count grows while the output is written, not only once it is committed
+    assert written == sorted(written)
+    assert any(0 < count < end.data["bytes_written"] for count in written)
@@ -0,0 +1,32 @@
+# atomic outputs
+
+import os, stat
+import pytest
+import fileio
+from fileio import AtomicOutput
+
+
+def _write(path, data, replace=False):
+    with AtomicOutput(str(path), replace=replace) as output:
+        output.write(data)
+        output.commit()
+
+
+@pytest.mark.skipif(os.name == "nt", reason="Windows has no permission bits")
+def test_atomic_output_mode(tmp_path):
+    path = tmp_path / "output.pdf"
+    _write(path, b"first")
+    assert stat.S_IMODE(path.stat().st_mode) == 0o666 & ~fileio._UMASK
+    # a replaced file keeps its permissions
+    path.chmod(0o640)
+    _write(path, b"second", replace=True)
+    assert stat.S_IMODE(path.stat().st_mode) == 0o640
+    assert path.read_bytes() == b"second"
+
+
+def test_atomic_output_never_replaces_by_default(tmp_path):
+    path = tmp_path / "output.pdf"
+    _write(path, b"first")
+    with pytest.raises(FileExistsError):
+        _write(path, b"second")
+    assert path.read_bytes() == b"first"
@@ -0,0 +1,111 @@
+# page deletion as an incremental update
+
+import queue, threading, zlib
+import pytest
+import PyPDF2
+from editor import PDFEditorBackend
+from incremental import IncrementalDeletion
+
+# the page tree: nested lists are intermediate /Pages nodes, numbers pages
+TREE = [[1, 2], [3, 4], 5, [[6], 7]]
+
+
+def _write_pdf(path, tree=TREE, xref_stream=False, broken_kid=False):
+    objects = {1: b"<< /Type /Catalog /Pages 2 0 R >>", 3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"}
+    next_id = [4]
+
+    def add(node, parent_id, node_id=None):
+        if node_id is None:
+            node_id = next_id[0]
+            next_id[0] += 1
+        if isinstance(node, int):
+            content_id = next_id[0]
+            next_id[0] += 1
+            text = b"BT /F1 24 Tf 72 720 Td (Page %d) Tj ET" % node
+            objects[content_id] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(text), text)
+            objects[node_id] = (b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] "
+                                b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (parent_id, content_id))
+            return node_id, 1
+        kids, count = [], 0
+        for kid in node:
+            kid_id, kid_count = add(kid, node_id)
+            kids.append(kid_id)
+            count += kid_count
+        if broken_kid and parent_id == 2:
+            # neither /Type nor /Kids
+            kids.append(next_id[0])
+            objects[next_id[0]] = b"<< /Parent %d 0 R >>" % node_id
+            next_id[0] += 1
+        parent = b" /Parent %d 0 R" % parent_id if parent_id else b""
+        objects[node_id] = b"<< /Type /Pages%s /Count %d /Kids [%s] >>" % (
+            parent, count, b" ".join(b"%d 0 R" % kid for kid in kids))
+        return node_id, count
+
+    add(tree, None, 2)
+    output, offsets = bytearray(b"%PDF-1.5\n"), {}
+    for object_id in sorted(objects):
+        offsets[object_id] = len(output)
+        output.extend(b"%d 0 obj\n%s\nendobj\n" % (object_id, objects[object_id]))
+    size, xref_offset = next_id[0], len(output)
+    if xref_stream:
+        offsets[size] = xref_offset
+        rows = b"\x00\x00\x00\x00\xff\xff" + b"".join(b"\x01" + offsets[object_id].to_bytes(4, "big") + b"\x00"
+                                                   for object_id in range(1, size + 1))
+        data = zlib.compress(rows)
+        output.extend(b"%d 0 obj\n<< /Type /XRef /Size %d /W [1 4 1] /Root 1 0 R /Filter /FlateDecode /Length %d >>\n"
+                      b"stream\n%s\nendstream\nendobj\n" % (size, size + 1, len(data), data))
+    else:
+        output.extend(b"xref\n0 %d\n0000000000 65535 f \n" % size)
+        for object_id in range(1, size):
+            output.extend(b"%010d 00000 n \n" % offsets[object_id])
+        output.extend(b"trailer\n<< /Size %d /Root 1 0 R >>\n" % size)
+    output.extend(b"startxref\n%d\n%%%%EOF\n" % xref_offset)
+    path.write_bytes(bytes(output))
+
+
+def _page_texts(path):
+    return [page.extract_text() for page in PyPDF2.PdfReader(path).pages]
+
+
+@pytest.mark.parametrize("xref_stream", [False, True])
+@pytest.mark.parametrize("in_place", [False, True])
+def test_incremental_delete(tmp_path, xref_stream, in_place):
+    source, output_folder = tmp_path / "source.pdf", tmp_path / "out"
+    _write_pdf(source, xref_stream=xref_stream)
+    original = source.read_bytes()
+    assert _page_texts(source) == [f"Page {page}" for page in range(1, 8)]
+    output_folder.mkdir()
+    message_queue = queue.Queue()
+    # pages 3 and 4 empty their intermediate node, page 6 a nested one
+    PDFEditorBackend(open_folder=False, cache_bytes=0).delete_pages(
+        [str(source)], str(output_folder), ["1", "3-4", "6"], message_queue, threading.Event(), incremental=True, in_place=in_place)
+    messages = [item for item in message_queue.queue if isinstance(item, tuple) and len(item) == 2]
+    assert not [message for message, is_error in messages if is_error]
+    assert not [message for message, _ in messages if "rewritten" in message]
+
+    if in_place:
+        assert list(output_folder.iterdir()) == []
+        result = source
+    else:
+        result, = output_folder.iterdir()
+        assert source.read_bytes() == original
+    data = result.read_bytes()
+    # the document is only appended to
+    assert data.startswith(original) and len(data) > len(original)
+    assert (b"/Type /XRef" in data[len(original):]) == xref_stream
+    assert _page_texts(result) == ["Page 2", "Page 5", "Page 7"]
+    reader = PyPDF2.PdfReader(result)
+    root = reader.trailer["/Root"]["/Pages"]
+    assert root["/Count"] == 3
+    # the emptied nodes are gone from the tree
+    assert len(root["/Kids"]) == 3
+    if not xref_stream:
+        # four pages and two intermediate nodes
+        freed = {idnum for idnum, free in reader.xref_free_entry.get(1, {}).items() if free}
+        assert len(freed) == 6
+
+
+def test_malformed_page_tree_falls_back(tmp_path):
+    source = tmp_path / "source.pdf"
+    _write_pdf(source, broken_kid=True)
+    assert IncrementalDeletion(PyPDF2.PdfReader(source), str(source)).build({0}) is None
@@ -0,0 +1,88 @@
+# byte-range passthrough copies of documents with incremental updates
+
+import queue, threading
+import PyPDF2
+from editor import PDFEditorBackend
+
+
+def _write_pdf(path, pages=3):
+    # the page tree follows the shared resources, so its replaced version
+    # sits between them and the next live object; the content streams
+    # contain the word endobj
+    output, offsets = bytearray(b"%PDF-1.4\n"), {}
+
+    def write_object(object_id, body):
+        offsets[object_id] = len(output)
+        output.extend(b"%d 0 obj\n%s\nendobj\n" % (object_id, body))
+
+    write_object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    write_object(4, b"<< /Font << /F1 3 0 R >> >>")
+    kids = b" ".join(b"%d 0 R" % (5 + 2 * page) for page in range(pages))
+    write_object(2, b"<< /Type /Pages /Count %d /Kids [%s] >>" % (pages, kids))
+    for page in range(pages):
+        page_id = 5 + 2 * page
+        text = b"BT /F1 24 Tf 72 720 Td (Page %d endobj) Tj ET" % (page + 1)
+        write_object(page_id, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources 4 0 R /Contents %d 0 R >>"
+                     % (page_id + 1))
+        write_object(page_id + 1, b"<< /Length %d >>\nstream\n%s\nendstream" % (len(text), text))
+    write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+    size, xref_offset = 5 + 2 * pages, len(output)
+    output.extend(b"xref\n0 %d\n0000000000 65535 f \n" % size)
+    for object_id in range(1, size):
+        output.extend(b"%010d 00000 n \n" % offsets[object_id])
+    output.extend(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref_offset))
+    path.write_bytes(bytes(output))
+
+
+def _move_font_to_object_stream(path, base_font):
+    # appends an update with an xref stream that replaces the font (object
+    # 3) by one stored in an object stream
+    output = bytearray(path.read_bytes())
+    previous = int(output[output.rindex(b"startxref") + 9:].split()[0])
+    size = int(output[output.rindex(b"/Size") + 5:].split()[0])
+    stream_id, xref_id = size, size + 1
+    font = b"<< /Type /Font /Subtype /Type1 /BaseFont /%s >>" % base_font
+    header = b"3 0 "
+    stream_offset = len(output)
+    output.extend(b"%d 0 obj\n<< /Type /ObjStm /N 1 /First %d /Length %d >>\nstream\n%s%s\nendstream\nendobj\n"
+                  % (stream_id, len(header), len(header) + len(font), header, font))
+    xref_offset = len(output)
+    entries = b"".join(bytes([kind]) + value.to_bytes(4, "big") + index.to_bytes(2, "big")
+                       for kind, value, index in ((2, stream_id, 0), (1, stream_offset, 0), (1, xref_offset, 0)))
+    output.extend(b"%d 0 obj\n<< /Type /XRef /Size %d /W [1 4 2] /Index [3 1 %d 2] /Root 1 0 R /Prev %d /Length %d >>\n"
+                  b"stream\n%s\nendstream\nendobj\nstartxref\n%d\n%%%%EOF\n"
+                  % (xref_id, xref_id + 1, stream_id, previous, len(entries), entries, xref_offset))
+    path.write_bytes(bytes(output))
+
+
+def _font(path):
+    return PyPDF2.PdfReader(path).pages[0]["/Resources"]["/Font"]["/F1"]["/BaseFont"]
+
+
+def test_passthrough_extract_after_incremental_delete(tmp_path):
+    source, updated_folder, extracted_folder = tmp_path / "source.pdf", tmp_path / "updated", tmp_path / "extracted"
+    _write_pdf(source)
+    updated_folder.mkdir()
+    extracted_folder.mkdir()
+    backend = PDFEditorBackend(open_folder=False, cache_bytes=0)
+    backend.delete_pages([str(source)], str(updated_folder), ["1"], queue.Queue(), threading.Event(), incremental=True)
+    updated, = updated_folder.iterdir()
+    backend.extract_pages([str(updated)], str(extracted_folder), ["1-2"], queue.Queue(), threading.Event(), passthrough=True)
+    extracted, = extracted_folder.iterdir()
+
+    reader = PyPDF2.PdfReader(extracted)
+    assert [page.extract_text() for page in reader.pages] == ["Page 2 endobj", "Page 3 endobj"]
+    # only the live version of every object is copied
+    assert b"/Count 3" not in extracted.read_bytes()
+
+
+def test_passthrough_uses_objects_moved_into_object_streams(tmp_path):
+    source, extracted_folder = tmp_path / "source.pdf", tmp_path / "extracted"
+    _write_pdf(source)
+    _move_font_to_object_stream(source, b"Courier")
+    assert _font(source) == "/Courier"
+    extracted_folder.mkdir()
+    PDFEditorBackend(open_folder=False, cache_bytes=0).extract_pages([str(source)], str(extracted_folder), ["1"], queue.Queue(),
+                                                                     threading.Event(), passthrough=True)
+    extracted, = extracted_folder.iterdir()
+    assert _font(extracted) == "/Courier"
@@ -0,0 +1,107 @@
+# page range parsing and selection
+
+import queue, threading
+import pytest
+import PyPDF2
+from corpus import write_synthetic_pdf
+from editor import PDFEditorBackend
+from selection import PageSelection, out_of_range, parse_page_ranges
+
+
+def _parse(pages_list):
+    message_queue = queue.Queue()
+    specs = parse_page_ranges(pages_list, message_queue)
+    return specs, [message for message, _ in message_queue.queue]
+
+
+@pytest.mark.parametrize("pages_list, specs", [
+    (["7"], [(7, 7, 1)]),
+    ([" 3-5 "], [(3, 5, 1)]),
+    (["10-"], [(10, None, 1)]),
+    (["-5"], [(-5, None, 1)]),
+    (["1-100:2"], [(1, 100, 2)]),
+    (["10-:3"], [(10, None, 3)]),
+    (["-4:2"], [(-4, None, 2)]),
+    (["1", "4-6", "9-"], [(1, 1, 1), (4, 6, 1), (9, None, 1)]),
+])
+def test_parse_valid(pages_list, specs):
+    assert _parse(pages_list) == (specs, [])
+
+
+@pytest.mark.parametrize("pages_list, error", [
+    ([], "non-empty"),
+    (["a"], "Invalid page number"),
+    (["1-b"], "Invalid page range format"),
+    (["1-2-3"], "Invalid page range format"),
+    (["-0"], "Invalid page range format"),
+    (["5-3"], "must not be greater"),
+    (["1-9:x"], "Invalid page step"),
+    (["1-9:0"], "at least 1"),
+    (["4:2"], "A step needs a page range"),
+])
+def test_parse_invalid(pages_list, error):
+    specs, messages = _parse(pages_list)
+    assert specs == []
+    assert len(messages) == 1 and error in messages[0]
+
+
+@pytest.mark.parametrize("pages_list, page_count, pages", [
+    (["2"], 5, [1]),
+    (["2-4"], 5, [1, 2, 3]),
+    (["3-"], 5, [2, 3, 4]),
+    (["-2"], 5, [3, 4]),
+    (["-9"], 5, [0, 1, 2, 3, 4]),
+    (["1-10:3"], 10, [0, 3, 6, 9]),
+    (["2-:2"], 7, [1, 3, 5]),
+    # overlapping and adjacent ranges are merged
+    (["1-3", "2-5", "6"], 8, [0, 1, 2, 3, 4, 5]),
+    (["4-6", "1-2"], 8, [0, 1, 3, 4, 5]),
+    (["1-9:2", "2-3"], 9, [0, 1, 2, 4, 6, 8]),
+    # pages past the last one are dropped
+    (["4-9", "12"], 5, [3, 4]),
+    (["6-"], 5, []),
+])
+def test_selection(pages_list, page_count, pages):
+    selection = PageSelection(_parse(pages_list)[0], page_count)
+    assert list(selection) == pages
+    assert len(selection) == len(pages)
+    assert bool(selection) == bool(pages)
+    assert [index for index in range(-1, page_count + 1) if index in selection] == pages
+    assert list(selection.complement()) == [index for index in range(page_count) if index not in pages]
+
+
+def test_selection_intervals():
+    selection = PageSelection(_parse(["1-3", "3-4", "7-8", "9"])[0], 10)
+    assert selection.intervals == [(0, 4), (6, 9)]
+
+
+@pytest.mark.parametrize("pages_list, beyond", [
+    (["1-5", "-9", "3-"], []),
+    (["6"], ["6"]),
+    (["4-6"], ["4-6"]),
+    (["7-"], ["7-"]),
+    (["2-9:3", "1"], ["2-9:3"]),
+])
+def test_out_of_range(pages_list, beyond):
+    assert out_of_range(_parse(pages_list)[0], 5) == beyond
+
+
+@pytest.mark.parametrize("pages_list, part_pages", [
+    # every selected page starts a new part; page 1 starts the first anyway
+    (["3"], [2, 3]),
+    (["1"], [5]),
+    (["2", "4"], [1, 2, 2]),
+    (["1-5:2"], [2, 2, 1]),
+    (["-2"], [3, 1, 1]),
+])
+def test_split_points(tmp_path, pages_list, part_pages):
+    source = tmp_path / "source.pdf"
+    with open(source, "wb") as output:
+        write_synthetic_pdf(output, 5)
+    output_folder = tmp_path / "parts"
+    output_folder.mkdir()
+    PDFEditorBackend(open_folder=False, cache_bytes=0).split_pdfs([str(source)], str(output_folder), pages_list,
+                                                                  queue.Queue(), threading.Event())
+    parts = [output_folder / f"source_part{i}.pdf" for i in range(len(part_pages))]
+    assert sorted(output_folder.iterdir()) == parts
+    assert [len(PyPDF2.PdfReader(part).pages) for part in parts] == part_pages
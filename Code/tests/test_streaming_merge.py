@@ -0,0 +1,44 @@
+# memory bound of the streaming merge
+
+import os, queue, threading, tracemalloc
+import PyPDF2
+from corpus import write_synthetic_pdf
+from editor import PDFEditorBackend
+from events import OperationEvent
+from fileio import OUTPUT_BUFFER_SIZE
+
+FILES = 1000
+
+
+def _merge(backend, input_paths, output_folder):
+    output_folder.mkdir()
+    message_queue = queue.Queue()
+    backend.merge_pdfs(input_paths, str(output_folder), message_queue, threading.Event(), streaming=True)
+    return [item for item in message_queue.queue if not isinstance(item, OperationEvent)]
+
+
+def test_streaming_merge_of_1000_files_stays_bounded(tmp_path):
+    input_paths = []
+    for index in range(FILES):
+        path = tmp_path / f"in{index:04d}.pdf"
+        with open(path, "wb") as output:
+            write_synthetic_pdf(output, 2, image_bytes=64 * 1024, shared_density=1.0, seed=index)
+        input_paths.append(str(path))
+    largest = max(os.path.getsize(path) for path in input_paths)
+    backend = PDFEditorBackend(open_folder=False, cache_bytes=0)
+    # the first parse imports and compiles what PyPDF2 needs lazily
+    _merge(backend, input_paths[:2], tmp_path / "warmup")
+
+    tracemalloc.start()
+    try:
+        messages = _merge(backend, input_paths, tmp_path / "out")
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    assert messages == [("Operation finished!", False)]
+    output_path, = (tmp_path / "out").iterdir()
+    assert len(PyPDF2.PdfReader(output_path).pages) == 2 * FILES
+    # the output buffer, a few inputs in flight and the xref offsets, while
+    # the inputs add up to FILES times the largest file
+    assert peak < OUTPUT_BUFFER_SIZE + 16 * largest + 2 * 1024 * FILES, (peak, largest)
@@ -0,0 +1,84 @@
+# output names of hot folder jobs and split parts
+
+import platform, queue, threading, time
+import pytest
+import PyPDF2
+from corpus import write_synthetic_pdf
+from editor import PDFEditorBackend
+from watch import PROCESSED_FOLDER, FolderWatcher, WatchRule
+
+
+def _drop(folder, names, pages):
+    folder.mkdir(exist_ok=True)
+    for seed, name in enumerate(names):
+        with open(folder / name, "wb") as output:
+            write_synthetic_pdf(output, pages, seed=seed)
+
+
+def _watch(rules, polling=True, done=None):
+    # until every file is processed, or done() is true
+    message_queue = queue.Queue()
+    watcher = FolderWatcher(rules, message_queue, workers=2, polling=polling)
+    watcher.start()
+    deadline = time.monotonic() + 60
+    try:
+        while True:
+            watcher.step(0.05)
+            if watcher.idle() and (done is None or done()):
+                break
+            assert time.monotonic() < deadline, "jobs did not finish"
+    finally:
+        watcher.close()
+    messages = list(message_queue.queue)
+    assert not [message for message, is_error in messages if is_error]
+    return messages
+
+
+def test_one_output_per_job(tmp_path):
+    scans, extracted, batches, merged = tmp_path / "scans", tmp_path / "extracted", tmp_path / "batches", tmp_path / "merged"
+    rules = [WatchRule(str(scans), "extract", str(extracted), ["1"], batch_seconds=0, settle_seconds=0),
+             WatchRule(str(batches), "merge", str(merged), batch_size=2, batch_seconds=0, settle_seconds=0)]
+    names = [f"scan_{index:04d}.pdf" for index in range(3)]
+    # the second round drops files of the same names, as a scanner
+    # restarting its numbering does
+    for _ in range(2):
+        _drop(scans, names, 3)
+        _drop(batches, names + ["scan_0003.pdf"], 2)
+        messages = _watch(rules)
+        assert sum(message.endswith("Operation finished!") for message, _ in messages) == 5
+
+    outputs = sorted(extracted.iterdir())
+    assert len(outputs) == 6
+    assert all(output.name.startswith(("scan_0000-", "scan_0001-", "scan_0002-")) for output in outputs)
+    assert [len(PyPDF2.PdfReader(output).pages) for output in outputs] == [1] * 6
+    outputs = sorted(merged.iterdir())
+    assert len(outputs) == 4
+    assert [len(PyPDF2.PdfReader(output).pages) for output in outputs] == [4] * 4
+    assert len(list((scans / PROCESSED_FOLDER).iterdir())) == 6
+
+
+
+@pytest.mark.skipif(platform.system() != "Linux", reason="inotify is Linux only")
+def test_chained_rules_with_inotify(tmp_path):
+    # the first rule's outputs appear in the second rule's folder
+    scans, pages, covers = tmp_path / "scans", tmp_path / "pages", tmp_path / "covers"
+    rules = [WatchRule(str(scans), "extract", str(pages), ["1-2"], batch_seconds=0, settle_seconds=0),
+             WatchRule(str(pages), "extract", str(covers), ["1"], batch_seconds=0, settle_seconds=0)]
+    _drop(scans, ["scan_0000.pdf", "scan_0001.pdf"], 3)
+    _watch(rules, polling=False, done=lambda: covers.exists() and len(list(covers.iterdir())) == 2)
+
+    assert len(list((pages / PROCESSED_FOLDER).iterdir())) == 2
+    assert [len(PyPDF2.PdfReader(output).pages) for output in sorted(covers.iterdir())] == [1, 1]
+
+def test_split_parts_share_one_free_number(tmp_path):
+    source = tmp_path / "source.pdf"
+    with open(source, "wb") as output:
+        write_synthetic_pdf(output, 3)
+    output_folder = tmp_path / "parts"
+    output_folder.mkdir()
+    (output_folder / "source_part1.pdf").write_bytes(b"")
+    (output_folder / "source_part0-1.pdf").write_bytes(b"")
+    PDFEditorBackend(open_folder=False, cache_bytes=0).split_pdfs([str(source)], str(output_folder), ["2", "3"],
+                                                                  queue.Queue(), threading.Event())
+    assert sorted(path.name for path in output_folder.iterdir() if path.stat().st_size) == [
+        "source_part0-2.pdf", "source_part1-2.pdf", "source_part2-2.pdf"]
@@ -0,0 +1,310 @@
+# hot folders: PDFs dropped into watched folders are batched into backend jobs
+
+import ctypes, ctypes.util, fnmatch, functools, itertools, os, platform, queue, select, struct, time
+from collections import namedtuple
+from editor import OPERATIONS, PDFEditorBackend
+from events import OperationEvent
+from scheduler import CANCELLED, DONE, JobScheduler
+
+# folder: watched folder (not its subfolders); operation: merge, delete,
+# extract or split; output: output folder; pages: page ranges (not merge);
+# a batch is submitted once it holds batch_size files or its first file
+# waited batch_seconds; a file is ready once its size and modification time
+# stayed the same for settle_seconds and it ends with %%EOF; pattern: file
+# names (case-insensitive); options: extra keyword arguments of the operation
+WatchRule = namedtuple("WatchRule", "folder operation output pages batch_size batch_seconds settle_seconds pattern options",
+                       defaults=(None, 20, 30.0, 2.0, "*.pdf", None))
+# seconds between checks of the files that are still being written
+POLL_SECONDS = 0.5
+# a file that stops changing without ending in %%EOF is given up on after this
+INCOMPLETE_SECONDS = 300
+# folders modified this recently are listed on every poll, since a file
+# added within the same timestamp tick leaves their modification time as it was
+MTIME_GRANULARITY_NS = 2 * 10**9
+# subfolders of a watched folder the inputs are moved to after their job
+PROCESSED_FOLDER = "processed"
+FAILED_FOLDER = "failed"
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _InotifyChanges:
+    # names closed after writing, moved into or created in the folders
+    # (Linux); a hard link, which AtomicOutput publishes outputs with, only
+    # raises IN_CREATE. Files still being written are left to the settle check
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._folders = {}
+
+    def add(self, folder):
+        descriptor = self._libc.inotify_add_watch(self._fd, os.fsencode(folder), _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE)
+        if descriptor < 0:
+            raise OSError(ctypes.get_errno(), f"Cannot watch {folder}")
+        self._folders[descriptor] = folder
+
+    def changes(self, timeout):
+        """Paths that may be new or changed, or None when events were lost."""
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return []
+        paths = []
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return paths
+            offset = 0
+            while offset < len(data):
+                descriptor, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if mask & _IN_Q_OVERFLOW:
+                    return None
+                if descriptor in self._folders and name:
+                    paths.append(os.path.join(self._folders[descriptor], os.fsdecode(name)))
+
+    def close(self):
+        os.close(self._fd)
+
+
+class _PollingChanges:
+    # a folder is listed again only when its modification time changed,
+    # which adding, removing or renaming a file in it does
+    def __init__(self):
+        self._folders = {}
+
+    def add(self, folder):
+        with os.scandir(folder) as entries:
+            self._folders[folder] = (os.stat(folder).st_mtime_ns, {entry.name for entry in entries})
+
+    def changes(self, timeout):
+        time.sleep(timeout)
+        paths = []
+        for folder, (mtime, names) in self._folders.items():
+            try:
+                current_mtime = os.stat(folder).st_mtime_ns
+                if current_mtime == mtime and time.time_ns() - current_mtime > MTIME_GRANULARITY_NS:
+                    continue
+                with os.scandir(folder) as entries:
+                    current_names = {entry.name for entry in entries}
+            except OSError:
+                continue
+            paths += [os.path.join(folder, name) for name in current_names - names]
+            self._folders[folder] = (current_mtime, current_names)
+        return paths
+
+    def close(self):
+        pass
+
+
+def _ends_with_eof(path):
+    with open(path, "rb") as pdf_file:
+        pdf_file.seek(max(0, os.path.getsize(path) - 1024))
+        return b"%%EOF" in pdf_file.read()
+
+
+def _move(path, folder_name):
+    # into the named subfolder next to path, never over another file
+    folder = os.path.join(os.path.dirname(path), folder_name)
+    os.makedirs(folder, exist_ok=True)
+    base, extension = os.path.splitext(os.path.basename(path))
+    target, number = os.path.join(folder, base + extension), 1
+    while os.path.exists(target):
+        target = os.path.join(folder, f"{base}-{number}{extension}")
+        number += 1
+    os.replace(path, target)
+
+
+class FolderWatcher:
+    """Turn PDFs dropped into watched folders into backend jobs.
+
+    New files are noticed through inotify on Linux, or by listing a folder
+    again when its modification time changes, so the cost of a check does
+    not grow with the files already processed. Once a file is ready (see
+    WatchRule) it joins its rule's batch; a merge batch becomes one job, the
+    other operations get a job per file. Merges wait for a second file.
+    Jobs run on a JobScheduler; afterwards the inputs are moved to the
+    processed or failed subfolder, and files already in a folder when it is
+    first watched are picked up as well. Outputs are named after their
+    inputs plus a batch id made of the watcher's start time and a counter,
+    so no job writes over another's output. Messages are posted to
+    message_queue as (message, is_error).
+    """
+
+    def __init__(self, rules, message_queue, backend=None, workers=None, polling=False):
+        self.rules = []
+        for rule in rules:
+            folder, output = os.path.abspath(rule.folder), os.path.abspath(rule.output)
+            if rule.operation not in OPERATIONS:
+                raise ValueError(f"Unknown operation: '{rule.operation}'.")
+            if rule.operation != "merge" and not rule.pages:
+                raise ValueError(f"Missing page ranges for {folder}.")
+            if folder == output:
+                raise ValueError(f"The output folder of {folder} must be another folder.")
+            if rule.operation == "merge" and rule.batch_size < 2:
+                raise ValueError(f"Merge batches of {folder} need room for two files.")
+            self.rules.append(rule._replace(folder=folder, output=output))
+        if len({rule.folder for rule in self.rules}) < len(self.rules):
+            raise ValueError("Every folder can only have one rule.")
+        self.message_queue = message_queue
+        self.backend = backend or PDFEditorBackend(open_folder=False, cache_bytes=0)
+        self.polling = polling or platform.system() != "Linux"
+        # path: [rule, size, mtime, seconds it stopped changing]
+        self._pending = {}
+        # folder: (files, seconds the first one was ready)
+        self._batches = {}
+        # job id: (rule, paths)
+        self._jobs = {}
+        # paths pending, batched or in a job
+        self._claimed = set()
+        self._run_id = time.strftime("%Y%m%d-%H%M%S")
+        self._batch_numbers = itertools.count(1)
+        self._updates = queue.Queue()
+        self.scheduler = JobScheduler(self._updates, workers)
+        self._changes = None
+
+    def start(self):
+        if not self.polling:
+            try:
+                self._changes = _InotifyChanges()
+            except (AttributeError, OSError):
+                self.polling = True
+        if self.polling:
+            self._changes = _PollingChanges()
+        for rule in self.rules:
+            os.makedirs(rule.folder, exist_ok=True)
+            os.makedirs(rule.output, exist_ok=True)
+            # watched before listing, so no file falls in between
+            self._changes.add(rule.folder)
+            self._add(os.path.join(rule.folder, name) for name in os.listdir(rule.folder))
+
+    def run(self, stop_event):
+        """Watch until stop_event is set; running jobs are then cancelled."""
+        self.start()
+        try:
+            while not stop_event.is_set():
+                self.step()
+        finally:
+            self.close()
+
+    def step(self, timeout=POLL_SECONDS):
+        """Wait up to timeout for new files, then move every file and job along."""
+        paths = self._changes.changes(timeout)
+        if paths is None:
+            # the kernel dropped events; list the folders again
+            paths = [os.path.join(rule.folder, name) for rule in self.rules for name in os.listdir(rule.folder)]
+        self._add(paths)
+        now = time.monotonic()
+        self._check_pending(now)
+        for folder, (paths, first_ready) in list(self._batches.items()):
+            rule = self._rule(folder)
+            if rule.operation == "merge" and len(paths) < 2:
+                continue
+            if len(paths) >= rule.batch_size or now - first_ready >= rule.batch_seconds:
+                self._submit(rule, paths)
+        self._finish_jobs()
+
+    def close(self):
+        self.scheduler.shutdown()
+        if self._changes is not None:
+            self._changes.close()
+
+    def idle(self):
+        """True when no file is waiting or being processed."""
+        return not self._claimed
+
+    def _rule(self, folder):
+        return next(rule for rule in self.rules if rule.folder == folder)
+
+    def _add(self, paths):
+        for path in paths:
+            rule = next((rule for rule in self.rules if rule.folder == os.path.dirname(path)), None)
+            name = os.path.basename(path)
+            if (rule is None or path in self._claimed or name.startswith(".")
+                    or not fnmatch.fnmatchcase(name.lower(), rule.pattern.lower()) or not os.path.isfile(path)):
+                continue
+            self._claimed.add(path)
+            self._pending[path] = [rule, None, None, None]
+
+    def _check_pending(self, now):
+        # only the files still being written are looked at again
+        for path, state in list(self._pending.items()):
+            rule = state[0]
+            try:
+                stat = os.stat(path)
+                if (stat.st_size, stat.st_mtime_ns) != (state[1], state[2]):
+                    state[1:] = [stat.st_size, stat.st_mtime_ns, now]
+                    continue
+                if now - state[3] < rule.settle_seconds:
+                    continue
+                complete = _ends_with_eof(path)
+            except OSError:
+                # removed or renamed while it was being written
+                del self._pending[path]
+                self._claimed.discard(path)
+                continue
+            if complete:
+                del self._pending[path]
+                paths, first_ready = self._batches.get(rule.folder, ([], now))
+                self._batches[rule.folder] = (paths + [path], first_ready)
+            elif now - state[3] >= INCOMPLETE_SECONDS:
+                del self._pending[path]
+                self._claimed.discard(path)
+                self.message_queue.put((f"{path} is not a complete PDF; moved to {FAILED_FOLDER}.", True))
+                self._move(path, FAILED_FOLDER)
+
+    def _submit(self, rule, paths):
+        # scanners number their files, so names give the merge order; a
+        # merge keeps a single file left over for the next batch
+        paths = sorted(paths)
+        groups = [paths[i:i + rule.batch_size] for i in range(0, len(paths), rule.batch_size)]
+        del self._batches[rule.folder]
+        if rule.operation == "merge":
+            if len(groups[-1]) < 2:
+                self._batches[rule.folder] = (groups.pop(), time.monotonic())
+        else:
+            groups = [[path] for path in paths]
+        operation = getattr(self.backend, OPERATIONS[rule.operation])
+        for group in groups:
+            target = functools.partial(operation, **(rule.options or {}), output_tag=f"{self._run_id}-{next(self._batch_numbers)}")
+            args = (group, rule.output) + ((list(rule.pages),) if rule.operation != "merge" else ())
+            job = self.scheduler.submit(rule.operation, target, args, group)
+            self._jobs[job.id] = (rule, group)
+            names = os.path.basename(group[0]) if len(group) == 1 else f"{len(group)} files"
+            self.message_queue.put((f"#{job.id} {rule.operation}: {names} from {rule.folder} queued.", False))
+
+    def _finish_jobs(self):
+        while True:
+            try:
+                job, item = self._updates.get_nowait()
+            except queue.Empty:
+                return
+            if isinstance(item, OperationEvent):
+                continue
+            if item is not None:
+                message, is_error = item
+                self.message_queue.put((f"#{job.id} {job.operation}: {message}", is_error))
+                continue
+            if not job.finished or job.id not in self._jobs:
+                continue
+            rule, paths = self._jobs.pop(job.id)
+            for path in paths:
+                self._claimed.discard(path)
+                # cancelled inputs stay, so they are picked up again next time
+                if job.status != CANCELLED:
+                    self._move(path, PROCESSED_FOLDER if job.status == DONE else FAILED_FOLDER)
+
+    def _move(self, path, folder_name):
+        try:
+            _move(path, folder_name)
+        except OSError as e:
+            self.message_queue.put((f"Cannot move {path} to {folder_name}: {e}", True))